@@ -0,0 +1,68 @@
+# Times autotiling debug2.lvl's tile layer with a 9 slice rule for tileset_green, as a full pass
+# and one cell at a time, and checks that the incremental results match a full pass.
+# Run from the project root: python -m benchmarks.autotile
+import random
+import time
+
+import numpy as np
+
+import scripts.level as L
+from scripts.autotile import AutoTiler, N, E, S, W
+
+SOURCE = "data/levels/debug2.lvl"
+RUNS = 20
+EDITS = 2000
+
+# 9 slice layout of tileset_green, 1 to 9 from the top left corner
+RULES = {
+    "tileset_green": {
+        "layer": "tiles",
+        "neighbours": 4,
+        "ignore": [16, 17],
+        "tiles": {
+            E|S: 1, E|S|W: 2, S|W: 3,
+            N|E|S: 4, N|E|S|W: 5, N|S|W: 6,
+            N|E: 7, N|E|W: 8, N|W: 9,
+        },
+    },
+}
+
+
+def main():
+    level = L.parse_json(SOURCE)
+    tiler = AutoTiler(RULES, level.palette, level.tilesets)
+    grid = level.layers["tiles"]
+    print(f"{SOURCE}: {grid.shape[1]}x{grid.shape[0]} cells, {np.count_nonzero(grid)} tiles")
+
+    changed = tiler.retile({"tiles": grid.copy()})
+    best = None
+    for i in range(RUNS):
+        work = {"tiles": grid.copy()}
+        start = time.perf_counter()
+        tiler.retile(work)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    print(f"full pass:   {best*1000:.2f}ms ({changed} cells changed)")
+
+    # Paint and erase random cells, retiling around each one
+    work = grid.copy()
+    tiler.retile({"tiles": work})
+    random.seed(0)
+    fill = level.palette.index(("tileset_green", 5))
+    start = time.perf_counter()
+    for i in range(EDITS):
+        gx = random.randrange(work.shape[1])
+        gy = random.randrange(work.shape[0])
+        work[gy, gx] = fill if random.random() < 0.5 else 0
+        tiler.retile_cell("tiles", work, gx, gy)
+    elapsed = time.perf_counter() - start
+    print(f"single cell: {elapsed/EDITS*1000000:.1f}us per edit")
+
+    expected = work.copy()
+    tiler.retile({"tiles": expected})
+    print("incremental matches full pass:", bool(np.array_equal(work, expected)))
+
+
+if __name__ == "__main__":
+    main()
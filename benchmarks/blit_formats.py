@@ -0,0 +1,74 @@
+# Counts the blit formats Assets picked for its images, animation frames and tiles, then blits a few
+# sprites the way they were loaded before the format pass (convert() plus a plain colorkey) and the way
+# Assets keeps them now, see Engine.optimize_surface.
+# Run from the project root: python -m benchmarks.blit_formats
+import os
+import time
+from collections import Counter
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+import scripts.Engine as E
+from scripts.assets import Assets
+
+VIEW = (400, 240)
+BLITS = 20000
+KINDS = ["opaque", "colorkey", "alpha"]
+
+
+def time_blits(surf, img):
+    start = time.perf_counter()
+    for i in range(BLITS):
+        surf.blit(img, (i % 300, i % 200))
+    return (time.perf_counter() - start)/BLITS
+
+def asset_group(assets, name):
+    if name in assets.images:
+        return "images"
+    if name.split("/")[0] in assets.tilesets:
+        return "tiles"
+    return "animations"
+
+def print_spread(assets):
+    spread = {}
+    for name, kind in assets.blit_formats.items():
+        spread.setdefault(asset_group(assets, name), Counter())[kind] += 1
+
+    print(f"{'assets':<12}" + "".join(f"{kind:>10}" for kind in KINDS))
+    for group, counts in sorted(spread.items()):
+        print(f"{group:<12}" + "".join(f"{counts[kind]:>10}" for kind in KINDS))
+    print()
+
+def main():
+    pygame.display.set_mode(VIEW)
+    surf = pygame.Surface(VIEW).convert()
+    assets = Assets()
+    print_spread(assets)
+
+    tiles = pygame.image.load("data/images/tilesets/tileset_green.png").convert()
+    sprites = [
+        ["player", "player/idle/idle1.png", E.ImageManager.load("data/images/animations/player/idle/idle1.png", (0, 0, 0)), assets.get_animation("player")["idle"][0]],
+        ["green tile", "tileset_green/1", E.ImageManager.get_image(tiles, 0, 0, 16, 16, 1), assets.get_tile("tileset_green", 1)],
+        ["dirt tile", "tileset_green/5", E.ImageManager.get_image(tiles, 16, 16, 16, 16, 1), assets.get_tile("tileset_green", 5)],
+        ["drone", "drone", E.ImageManager.load("data/images/drone.png", (0, 0, 0)), assets.get_image("drone")],
+        ["mountain", "mountain", E.ImageManager.load("data/images/mountain.png", (0, 0, 0)), assets.get_image("mountain")],
+        ["bg trees", "bg_trees", E.ImageManager.load("data/images/bg_trees..png", (0, 0, 0)), assets.get_image("bg_trees")],
+    ]
+
+    # plain is an opaque sprite without its RLE colorkey, what optimize_surface would pick without it
+    print(f"{'sprite':<12}{'kind':>10}{'before':>10}{'after':>10}{'plain':>10}")
+    for name, asset, before, after in sprites:
+        before_time = time_blits(surf, before)
+        after_time = time_blits(surf, after)
+        plain = "-"
+        if assets.blit_formats[asset] == "opaque":
+            plain_img = after.copy()
+            plain_img.set_colorkey(None)
+            plain = f"{time_blits(surf, plain_img)*1e6:.2f}us"
+        print(f"{name:<12}{assets.blit_formats[asset]:>10}{before_time*1e6:>8.2f}us{after_time*1e6:>8.2f}us{plain:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# Reports how many collision rects each level has before and after merging solid tiles,
+# and how many rects a get_tiles_near_object query has to test on average
+# Run from the project root: python -m benchmarks.collision_merge
+import os
+import random
+import time
+
+import scripts.level as L
+from scripts.tilemap import TileMap, TILESIZE
+
+LEVEL_PATH = "data/levels/"
+QUERIES = 5000
+
+
+def query_stats(tile_map, level, radius):
+    rng = random.Random(0)
+    left, top, right, bottom = level.bounds
+    positions = [[rng.uniform(left, right)*TILESIZE, rng.uniform(top, bottom)*TILESIZE] for i in range(QUERIES)]
+
+    candidates = 0
+    start = time.perf_counter()
+    for pos in positions:
+        candidates += len(tile_map.query_near(pos, radius)[0])
+    elapsed = time.perf_counter() - start
+    return candidates/QUERIES, elapsed/QUERIES*1000000
+
+def main():
+    print(f"{'level':<16}{'solid':>7}{'merged':>8}{'ramps':>7}{'r=3 rects':>16}{'r=4 rects':>16}{'r=4 query':>18}")
+
+    for filename in sorted(os.listdir(LEVEL_PATH)):
+        if not filename.endswith(".lvl"):
+            continue
+        level = L.load_level(LEVEL_PATH + filename)
+
+        tiles = TileMap.from_level(level)
+        merged = TileMap.from_level(level)
+        merged.merge_solids()
+
+        solid, merged_count, ramps = merged.rect_counts()
+        before_3, _ = query_stats(tiles, level, 3)
+        after_3, _ = query_stats(merged, level, 3)
+        before_4, before_time = query_stats(tiles, level, 4)
+        after_4, after_time = query_stats(merged, level, 4)
+
+        print(f"{filename:<16}{solid:>7}{merged_count:>8}{ramps:>7}{before_3:>8.1f} ->{after_3:>5.1f}{before_4:>8.1f} ->{after_4:>5.1f}{before_time:>8.1f} ->{after_time:>5.1f}us")
+
+
+if __name__ == "__main__":
+    main()
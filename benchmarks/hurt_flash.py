@@ -0,0 +1,78 @@
+# Draws crowds of dummies and drones that are all flashing from a hit at once, with the hurt flash made
+# from a mask every frame like draw_damage_mask used to, and with the shared silhouette_cache.
+# Run from the project root: python -m benchmarks.hurt_flash
+import os
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from scripts.assets import Assets
+from scripts.Engine import silhouette_cache
+from scripts.entity import HurtableEntity
+
+VIEW = (400, 240)
+FRAMES = 300
+
+
+def dummies(assets, count):
+    entities = []
+    for i in range(count):
+        entity = HurtableEntity((i*23) % VIEW[0], (i*37) % VIEW[1], 32, 32, 0, 0, 0, 10, assets.create_animation_object("dummy"))
+        entity.animation.set_loop(True)
+        entity.state = "hurt"
+        entity.hurt = True
+        entities.append(entity)
+    return entities
+
+def drones(assets, count):
+    # Like Drone, every one has its own Animation and shares the drone image
+    entities = []
+    for i in range(count):
+        entity = HurtableEntity((i*23) % VIEW[0], (i*37) % VIEW[1], 32, 32, 0, 0, 0, 10)
+        entity.image = assets.get_image("drone")
+        entity.animate = lambda: None
+        entity.hurt = True
+        entities.append(entity)
+    return entities
+
+def draw_masks(surf, entities):
+    for frame in range(FRAMES):
+        for entity in entities:
+            entity.animate()
+            mask = pygame.mask.from_surface(entity.image)
+            img = mask.to_surface(unsetcolor=(0, 0, 0, 0), setcolor=(255, 255, 255, 255))
+            surf.blit(img, (entity.rect.x, entity.rect.y))
+
+def draw_silhouettes(surf, entities):
+    for frame in range(FRAMES):
+        for entity in entities:
+            entity.animate()
+            entity.draw_damage_mask(surf)
+
+def main():
+    pygame.display.set_mode((1, 1))
+    surf = pygame.Surface(VIEW)
+    assets = Assets()
+
+    print(f"{'crowd':<8}{'enemies':>8}{'mask':>10}{'silhouette':>12}{'built':>7}")
+    for name, crowd in [["dummy", dummies], ["drone", drones]]:
+        for count in [10, 50, 200]:
+            entities = crowd(assets, count)
+
+            start = time.perf_counter()
+            draw_masks(surf, entities)
+            mask_time = (time.perf_counter() - start)/FRAMES
+
+            silhouette_cache.cache.clear()
+            built = silhouette_cache.misses
+            start = time.perf_counter()
+            draw_silhouettes(surf, entities)
+            silhouette_time = (time.perf_counter() - start)/FRAMES
+
+            print(f"{name:<8}{count:>8}{mask_time*1000:>8.3f}ms{silhouette_time*1000:>10.3f}ms{silhouette_cache.misses - built:>7}")
+
+
+if __name__ == "__main__":
+    main()
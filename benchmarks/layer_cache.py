@@ -0,0 +1,87 @@
+# Compares drawing the static layers tile by tile against blitting baked LayerCache chunks while the
+# camera pans across a level. Run from the project root: python -m benchmarks.layer_cache
+import os
+import tempfile
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import math
+import numpy as np
+import pygame
+
+import scripts.level as L
+from scripts.assets import Assets
+from scripts.render_cache import LayerCache
+from tools.generate_level import generate, write_level
+
+TILESIZE = 16
+LAYERS = ["background", "decor", "tiles", "foreground"]
+VIEW = (400, 240)
+FRAMES = 600
+
+
+def prepare(level, assets):
+    tile_images = [None] + [assets.get_tile(tileset, tile_id) for tileset, tile_id in level.palette[1:]]
+    overhang = {}
+    for layer in level.layer_names:
+        overhang[layer] = [0, 0]
+        for ref in level.layer_refs(layer):
+            overhang[layer][0] = max(overhang[layer][0], math.ceil(tile_images[ref].get_width()/TILESIZE)-1)
+            overhang[layer][1] = max(overhang[layer][1], math.ceil(tile_images[ref].get_height()/TILESIZE)-1)
+    return tile_images, overhang
+
+def scrolls(level):
+    # Follow the row the tiles are centered on, like a camera following the player along the ground
+    rows = np.nonzero(level.layers["tiles"])[0]
+    top = (level.origin[1] + int(np.median(rows)))*TILESIZE - VIEW[1]//2
+    left = level.origin[0]*TILESIZE
+    right = (level.origin[0] + level.width)*TILESIZE - VIEW[0]
+    for frame in range(FRAMES):
+        yield [left + (frame*3) % max(right-left, 1), top + int(math.sin(frame/30)*40)]
+
+def draw_tiles(surf, level, tile_images, overhang):
+    for scroll in scrolls(level):
+        for layer in LAYERS:
+            x0 = scroll[0]//TILESIZE - overhang[layer][0]
+            y0 = scroll[1]//TILESIZE - overhang[layer][1]
+            x1 = (scroll[0]+VIEW[0])//TILESIZE
+            y1 = (scroll[1]+VIEW[1])//TILESIZE
+            for ref, x, y in level.tiles_in_region(layer, x0, y0, x1, y1):
+                surf.blit(tile_images[ref], (x*TILESIZE-scroll[0], y*TILESIZE-scroll[1]))
+
+def draw_cached(surf, cache, level):
+    for scroll in scrolls(level):
+        for layer in LAYERS:
+            cache.draw(surf, layer, scroll)
+
+def main():
+    pygame.display.set_mode((1, 1))
+    surf = pygame.Surface(VIEW)
+    assets = Assets()
+
+    with tempfile.TemporaryDirectory() as folder:
+        levels = [["debug2", L.load_level("data/levels/debug2.lvl")]]
+        for width in [2000, 10000]:
+            path = os.path.join(folder, f"generated_{width}.lvl")
+            write_level(generate(width=width, seed=1), path)
+            levels.append([f"generated {width}", L.load_level(path)])
+
+        print(f"{'level':<18}{'cells':>10}{'per tile':>11}{'baked':>10}{'bakes':>7}")
+        for name, level in levels:
+            tile_images, overhang = prepare(level, assets)
+
+            start = time.perf_counter()
+            draw_tiles(surf, level, tile_images, overhang)
+            tile_time = (time.perf_counter() - start)/FRAMES
+
+            cache = LayerCache(level, tile_images, overhang)
+            start = time.perf_counter()
+            draw_cached(surf, cache, level)
+            cache_time = (time.perf_counter() - start)/FRAMES
+
+            print(f"{name:<18}{level.width*level.height:>10}{tile_time*1000:>9.3f}ms{cache_time*1000:>8.3f}ms{cache.bakes:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# Compares level load times between the JSON .lvl files and their compiled .lvlc copies, after checking
+# that a truncated .lvlc gets rebuilt instead of failing. Run from the project root: python -m benchmarks.level_load
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import scripts.level as L
+
+LEVEL_PATH = "data/levels/"
+RUNS = 20
+
+
+def best_time(func, runs=RUNS):
+    best = None
+    for i in range(runs):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best*1000
+
+def json_load(path):
+    with open(path) as file:
+        return json.load(file)
+
+def check_truncated(path):
+    # Loads path with its compiled copy cut short at a few lengths, each time it has to be rebuilt
+    with tempfile.TemporaryDirectory() as folder:
+        copy = os.path.join(folder, os.path.basename(path))
+        shutil.copy(path, copy)
+        L.load_level(copy)
+        cache = L.compiled_path(copy)
+        with open(cache, "rb") as file:
+            data = file.read()
+
+        for fraction in [0.1, 0.5, 0.9, 0.99]:
+            with open(cache, "wb") as file:
+                file.write(data[:int(len(data)*fraction)])
+            if L.load_level(copy) is None or L.read_compiled(cache) is None:
+                return False
+    return True
+
+def main():
+    for filename in sorted(os.listdir(LEVEL_PATH)):
+        if filename.endswith(".lvl") and not check_truncated(LEVEL_PATH + filename):
+            print(f"{filename}: a truncated .lvlc wasn't rebuilt")
+            return 1
+    print("Truncated .lvlc files get rebuilt\n")
+
+    print(f"{'level':<16}{'size (KB)':>10}{'json.load':>12}{'json->Level':>13}{'compiled':>11}{'speedup':>9}")
+
+    for filename in sorted(os.listdir(LEVEL_PATH)):
+        if not filename.endswith(".lvl"):
+            continue
+        path = LEVEL_PATH + filename
+
+        # Make sure the compiled copy is up to date before timing it
+        L.load_level(path)
+
+        json_time = best_time(lambda: json_load(path))
+        parse_time = best_time(lambda: L.parse_json(path))
+        compiled_time = best_time(lambda: L.load_level(path))
+
+        size = os.path.getsize(path)/1024
+        print(f"{filename:<16}{size:>10.1f}{json_time:>10.2f}ms{parse_time:>11.2f}ms{compiled_time:>9.2f}ms{parse_time/compiled_time:>8.1f}x")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
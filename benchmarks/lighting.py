@@ -0,0 +1,48 @@
+# Times LightMap.draw with a growing number of lights scattered over the view, shadows cast by the
+# solid tiles of debug2. Run from the project root: python -m benchmarks.lighting
+import os
+import random
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+import pygame
+
+import scripts.level as L
+from scripts.lighting import LightMap
+from scripts.tilemap import TileMap, TILESIZE
+
+VIEW = (400, 240)
+FRAMES = 100
+COUNTS = [1, 10, 100, 300, 512, 2000]
+
+
+def main():
+    pygame.display.set_mode((1, 1))
+    surf = pygame.Surface(VIEW).convert()
+    level = L.load_level("data/levels/debug2.lvl")
+    tiles = TileMap.from_level(level)
+
+    # Frame the row the tiles are centered on, like the camera following the player
+    rows = np.nonzero(level.layers["tiles"])[0]
+    scroll = [level.origin[0]*TILESIZE, (level.origin[1] + int(np.median(rows)))*TILESIZE - VIEW[1]//2]
+
+    print(f"{'lights':<8}{'shadowed':>10}{'convolved':>11}{'dropped':>9}{'per frame':>12}")
+    for count in COUNTS:
+        random.seed(count)
+        lighting = LightMap(VIEW)
+        lights = [[scroll[0]+random.uniform(0, VIEW[0]), scroll[1]+random.uniform(0, VIEW[1]), random.choice([16, 32, 48, 96])] for i in range(count)]
+
+        start = time.perf_counter()
+        for frame in range(FRAMES):
+            for x, y, radius in lights:
+                lighting.add((x, y), radius, (255, 200, 120), 0.6)
+            lighting.draw(surf, scroll, tiles)
+        frame_time = (time.perf_counter() - start)/FRAMES
+
+        print(f"{count:<8}{lighting.stats['shadowed']:>10}{lighting.stats['convolved']:>11}{lighting.stats['dropped']:>9}{frame_time*1000:>10.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
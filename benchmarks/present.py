@@ -0,0 +1,36 @@
+# Times Window.update in every present mode with the game's 400x240 display shown at 3x.
+# Run from the project root: python -m benchmarks.present
+# With the default dummy video driver this only times the scaling and blitting, set SDL_VIDEODRIVER to
+# a real driver to include the trip to the screen.
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from scripts.window import Window, PRESENT_MODES
+
+DISPLAY = (400, 240)
+SCALE = 3
+FRAMES = 600
+
+
+def main():
+    pygame.init()
+    display = pygame.Surface(DISPLAY)
+
+    print(f"{'mode':<12}{'present':>10}")
+    for mode in PRESENT_MODES:
+        window = Window(DISPLAY[0]*SCALE, DISPLAY[1]*SCALE, "present benchmark", display, present_mode=mode)
+        total = 0
+        for frame in range(FRAMES):
+            display.fill((frame % 256, 64, 128))
+            window.update()
+            total += window.present_time
+        print(f"{mode:<12}{total/FRAMES*1000:>8.3f}ms")
+
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# Generates levels of growing size and enemy count and measures how load and frame times scale.
+# Each case runs headless in its own process. Run from the project root: python -m benchmarks.scaling
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from tools.generate_level import generate, write_level
+
+WIDTHS = [200, 1000, 5000]
+ENEMY_COUNTS = [0, 50, 200, 800]
+FRAMES = 300
+SEED = 1
+
+
+def run(path, frames):
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
+    import pygame
+    import scripts
+    import scripts.level as L
+
+    pygame.init()
+
+    class Game:
+        def __init__(self):
+            display = pygame.Surface((400, 240))
+            self.window = scripts.Window(400*3, 240*3, "Slash", display)
+            self.clock = pygame.time.Clock()
+            self.joystick = None
+            self.FPS = 0
+            self.running = True
+            self.assets = scripts.Assets()
+            self.gm = scripts.GM(self)
+
+        def quit(self):
+            self.running = False
+
+    game = Game()
+    gm = game.gm
+
+    start = time.perf_counter()
+    L.load_level(path, use_cache=False)
+    compile_time = time.perf_counter() - start
+
+    L.load_level(path)
+    start = time.perf_counter()
+    gm.load_level(path)
+    load_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for frame in range(frames):
+        gm.run()
+    frame_time = (time.perf_counter() - start)/frames
+
+    return {"compile_ms": compile_time*1000, "load_ms": load_time*1000, "frame_ms": frame_time*1000, "enemies": len(gm.enemies)}
+
+def main():
+    with tempfile.TemporaryDirectory() as folder:
+        print(f"{'width':>6}{'enemies':>9}{'compile':>11}{'load':>10}{'frame':>10}")
+        for width in WIDTHS:
+            for enemies in ENEMY_COUNTS:
+                path = os.path.join(folder, f"stress_{width}_{enemies}.lvl")
+                write_level(generate(width=width, enemies=enemies, battle_rooms=max(width//200, 1), seed=SEED), path)
+
+                out = subprocess.run([sys.executable, "-m", "benchmarks.scaling", path], capture_output=True, text=True, check=True)
+                result = json.loads(out.stdout.strip().splitlines()[-1])
+                print(f"{width:>6}{enemies:>9}{result['compile_ms']:>9.1f}ms{result['load_ms']:>8.1f}ms{result['frame_ms']:>8.2f}ms")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 2:
+        print(json.dumps(run(sys.argv[1], FRAMES)))
+    else:
+        main()
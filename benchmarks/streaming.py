@@ -0,0 +1,100 @@
+# Scales debug2.lvl up to 100x its width and compares loading it whole against streaming it in chunks.
+# Each run happens in its own process so the RSS numbers don't leak into each other.
+# Run from the project root: python -m benchmarks.streaming
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import scripts.level as L
+from scripts.streaming import LevelStreamer
+from scripts.tilemap import TileMap, TILESIZE
+
+SOURCE = "data/levels/debug2.lvl"
+SCALES = [1, 10, 100]
+FRAMES = 1500
+VIEW = (400, 240)
+
+
+def build_scaled(level, scale, path):
+    width = level.width
+    layers = {layer: np.tile(grid, (1, scale)) for layer, grid in level.layers.items()}
+
+    objects = []
+    for i in range(scale):
+        for obj in level.objects:
+            rect = list(obj["rect"])
+            rect[0] += i*width*TILESIZE
+            objects.append({"rect": rect, "name": obj["name"], "properties": obj["properties"]})
+
+    bounds = list(level.bounds)
+    bounds[2] = bounds[0] + width*scale
+    scaled = L.Level(level.name, level.origin, [width*scale, level.size[1]], bounds, level.tilesets, level.palette, layers, objects)
+    L.write_compiled(scaled, path)
+
+def rss_kb():
+    try:
+        with open("/proc/self/status") as file:
+            for line in file:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def run(path, stream):
+    start = time.perf_counter()
+    level = L.read_compiled(path, stream=stream)
+    if stream:
+        tiles = LevelStreamer(level)
+        for obj in level.objects:
+            tiles.add_object(obj)
+    else:
+        tiles = TileMap.from_level(level)
+        tiles.merge_solids()
+    load_time = time.perf_counter() - start
+
+    # Pan the camera across the level, querying collisions for a handful of bodies and walking the visible tiles
+    left = level.origin[0]*TILESIZE
+    top = (level.origin[1] + level.height//2)*TILESIZE - VIEW[1]//2
+    start = time.perf_counter()
+    for frame in range(FRAMES):
+        x = left + frame*4
+        view = [x, top, x+VIEW[0], top+VIEW[1]]
+        if stream:
+            tiles.update(view)
+        for body in range(12):
+            tiles.query_near([x + body*32, top + VIEW[1]//2], 3)
+        source = tiles if stream else level
+        for layer in level.layer_names:
+            for tile in source.tiles_in_region(layer, view[0]//TILESIZE, view[1]//TILESIZE, view[2]//TILESIZE, view[3]//TILESIZE):
+                pass
+    frame_time = (time.perf_counter() - start)/FRAMES
+
+    return {"load_ms": load_time*1000, "frame_ms": frame_time*1000, "rss_mb": rss_kb()/1024}
+
+def main():
+    level = L.load_level(SOURCE)
+
+    with tempfile.TemporaryDirectory() as folder:
+        print(f"{'scale':>6}{'cells':>10}{'mode':>8}{'load':>11}{'frame':>10}{'rss':>10}")
+        for scale in SCALES:
+            path = os.path.join(folder, f"debug2_x{scale}.lvlc")
+            build_scaled(level, scale, path)
+
+            for mode in ["full", "stream"]:
+                out = subprocess.run([sys.executable, "-m", "benchmarks.streaming", path, mode], capture_output=True, text=True, check=True)
+                result = json.loads(out.stdout.strip().splitlines()[-1])
+                print(f"{scale:>5}x{level.width*level.height*scale:>10}{mode:>8}{result['load_ms']:>9.1f}ms{result['frame_ms']:>8.3f}ms{result['rss_mb']:>8.1f}MB")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3:
+        print(json.dumps(run(sys.argv[1], sys.argv[2] == "stream")))
+    else:
+        main()
@@ -0,0 +1,98 @@
+# Compares three ways of drawing the visible tiles of a layer, without the LayerCache in front:
+#   per tile - one blit call per tile, what play_game used to do
+#   atlas    - one blits call per layer with source rects into a single surface holding every tileset
+#   fblits   - one fblits call per layer with the tile surfaces, destinations worked out with numpy
+# Run from the project root: python -m benchmarks.tile_batching
+import os
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from benchmarks.layer_cache import prepare, scrolls, LAYERS, VIEW, FRAMES, TILESIZE
+import scripts.level as L
+from scripts.assets import Assets
+from scripts.render_cache import draw_tiles
+
+LEVELS = ["data/levels/debug2.lvl", "data/levels/debug.lvl"]
+
+
+def build_atlas(tile_images):
+    # Packs the level's tile surfaces into one row, returns the atlas and each ref's area in it
+    width = sum(img.get_width() for img in tile_images[1:])
+    height = max(img.get_height() for img in tile_images[1:])
+    atlas = pygame.Surface((width, height)).convert()
+    atlas.fill((0, 0, 0))
+    atlas.set_colorkey((0, 0, 0))
+
+    areas = [None]
+    x = 0
+    for img in tile_images[1:]:
+        atlas.blit(img, (x, 0))
+        areas.append(pygame.Rect(x, 0, img.get_width(), img.get_height()))
+        x += img.get_width()
+    return atlas, areas
+
+def view_region(level, overhang, layer, scroll):
+    x0 = scroll[0]//TILESIZE - overhang[layer][0]
+    y0 = scroll[1]//TILESIZE - overhang[layer][1]
+    x1 = (scroll[0]+VIEW[0])//TILESIZE
+    y1 = (scroll[1]+VIEW[1])//TILESIZE
+    return [x0, y0, x1, y1]
+
+def draw_per_tile(surf, level, tile_images, overhang, scroll):
+    for layer in LAYERS:
+        for ref, x, y in level.tiles_in_region(layer, *view_region(level, overhang, layer, scroll)):
+            surf.blit(tile_images[ref], (x*TILESIZE-scroll[0], y*TILESIZE-scroll[1]))
+
+def draw_atlas(surf, level, atlas, areas, overhang, scroll):
+    for layer in LAYERS:
+        tiles = level.tiles_in_region(layer, *view_region(level, overhang, layer, scroll))
+        surf.blits([(atlas, (x*TILESIZE-scroll[0], y*TILESIZE-scroll[1]), areas[ref]) for ref, x, y in tiles], False)
+
+def draw_fblits(surf, level, tile_images, overhang, scroll):
+    for layer in LAYERS:
+        draw_tiles(surf, tile_images, level.region(layer, *view_region(level, overhang, layer, scroll)), scroll)
+
+def main():
+    pygame.display.set_mode((1, 1))
+    surf = pygame.Surface(VIEW)
+    assets = Assets()
+
+    print(f"{'level':<24}{'tiles/frame':>12}{'per tile':>11}{'atlas':>10}{'fblits':>10}{'same':>6}")
+    for path in LEVELS:
+        level = L.load_level(path)
+        tile_images, overhang = prepare(level, assets)
+        atlas, areas = build_atlas(tile_images)
+        frames = list(scrolls(level))
+
+        count = sum(len(level.region(layer, *view_region(level, overhang, layer, scroll))[0]) for scroll in frames for layer in LAYERS)
+
+        modes = [
+            lambda scroll: draw_per_tile(surf, level, tile_images, overhang, scroll),
+            lambda scroll: draw_atlas(surf, level, atlas, areas, overhang, scroll),
+            lambda scroll: draw_fblits(surf, level, tile_images, overhang, scroll),
+        ]
+        times = []
+        for draw in modes:
+            start = time.perf_counter()
+            for scroll in frames:
+                draw(scroll)
+            times.append((time.perf_counter() - start)/FRAMES)
+
+        # Every mode has to give the same picture
+        same = True
+        for scroll in frames[::50]:
+            pictures = set()
+            for draw in modes:
+                surf.fill((127, 127, 127))
+                draw(scroll)
+                pictures.add(pygame.image.tobytes(surf, "RGB"))
+            same = same and len(pictures) == 1
+
+        print(f"{path:<24}{count/FRAMES:>12.0f}{times[0]*1000:>9.3f}ms{times[1]*1000:>8.3f}ms{times[2]*1000:>8.3f}ms{str(same):>6}")
+
+
+if __name__ == "__main__":
+    main()
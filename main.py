@@ -5,10 +5,12 @@ pygame.init()
 pygame.font.init()
 pygame.joystick.init()
 
+PRESENT_MODE = "scale_into" # "scale", "scale_into" or "native", see scripts/window.py
+
 class Game:
     def __init__(self):
         display = pygame.Surface((400, 240))
-        self.window = scripts.Window(400*3, 240*3, "Slash", display)
+        self.window = scripts.Window(400*3, 240*3, "Slash", display, present_mode=PRESENT_MODE)
         self.clock = pygame.time.Clock()
         self.joystick = None
         self.FPS = 60
@@ -4,6 +4,8 @@ import xml.etree.ElementTree as ET
 import json
 import math
 import os
+from collections import OrderedDict
+import numpy as np
 pygame.init()
 
 #functions
@@ -15,15 +17,25 @@ def swap_color(img,old_c,new_c):
     surf.set_colorkey((0,0,0))
     return surf
 
-def perfect_outline(img, surf, loc, color, colorkey=(0,0,0), colorkey2=(0,0,0)):
-    img.set_colorkey(colorkey)
+def make_outline(img, color, colorkey=(0,0,0)):
+    # img's silhouette moved 1px left, right, up and down merged into one surface, goes 1px up and left of img
+    if img.get_colorkey() == None or tuple(img.get_colorkey()[:3]) != tuple(colorkey[:3]):
+        img.set_colorkey(colorkey) # Only when it differs, setting it again would drop RLEACCEL
     mask = pygame.mask.from_surface(img)
     mask_surf = mask.to_surface(setcolor=color)
     mask_surf.set_colorkey((0,0,0))
-    surf.blit(mask_surf,(loc[0]-1,loc[1]))
-    surf.blit(mask_surf,(loc[0]+1,loc[1]))
-    surf.blit(mask_surf,(loc[0],loc[1]-1))
-    surf.blit(mask_surf,(loc[0],loc[1]+1))
+    outline = pygame.Surface((img.get_width()+2, img.get_height()+2))
+    outline.fblits([(mask_surf, (0, 1)), (mask_surf, (2, 1)), (mask_surf, (1, 0)), (mask_surf, (1, 2))])
+    outline.set_colorkey((0,0,0))
+    return outline
+
+def perfect_outline(img, surf, loc, color, colorkey=(0,0,0), colorkey2=(0,0,0), cache=True):
+    # cache=False for surfaces that get drawn on between calls, the cache only knows a surface by identity
+    if cache:
+        outline = outline_cache.get(img, color, colorkey)
+    else:
+        outline = make_outline(img, color, colorkey)
+    surf.blit(outline,(loc[0]-1,loc[1]-1))
 
 def blit_center(surf, other_surf, pos):
     x = int(other_surf.get_width()/2)
@@ -184,6 +196,60 @@ def SAT_Collision(A, B, rotA, rotB):
 
 #Image manager
 VALID_IMAGE_FORMATS = ["png", "jpg"]
+COLORKEY_CANDIDATES = [(0, 0, 0), (255, 0, 255), (0, 255, 255), (1, 2, 3)]
+
+def optimize_surface(img, colorkey=None):
+    """
+    Picks the fastest way to blit img from what's in it, returns [surface, kind]:
+    opaque   -> no pixel of img is see through, still RLE encoded under a colorkey no pixel has since
+                that blits about twice as fast as a plain surface (benchmarks/blit_formats.py)
+    colorkey -> colorkey with RLEACCEL, pixels are either fully see through or not at all
+    alpha    -> per pixel alpha, only when some pixels are partly see through
+    Pixels with alpha 0 or matching colorkey (img's own colorkey if None) are see through, so pass
+    img before convert() has thrown its alpha away.
+    Don't draw on opaque or colorkey results, RLE surfaces are slow to change.
+    """
+    if colorkey == None:
+        colorkey = img.get_colorkey()
+    if colorkey != None:
+        colorkey = tuple(colorkey[:3])
+
+    rgb = pygame.surfarray.array3d(img)
+    clear = np.all(rgb == colorkey, axis=2) if colorkey != None else np.zeros(img.get_size(), dtype=bool)
+    if img.get_flags() & pygame.SRCALPHA:
+        alpha = pygame.surfarray.array_alpha(img)
+        if np.any((alpha > 0) & (alpha < 255)):
+            surf = img.convert_alpha()
+            if clear.any():
+                surf_alpha = pygame.surfarray.pixels_alpha(surf)
+                surf_alpha[clear] = 0
+                del surf_alpha # Unlocks surf
+            return [surf, "alpha"]
+        clear |= alpha == 0
+
+    if colorkey == None:
+        # Only alpha says what's see through, use a key no visible pixel has
+        visible = rgb[~clear]
+        for key in COLORKEY_CANDIDATES:
+            if not np.any(np.all(visible == key, axis=1)):
+                colorkey = key
+                break
+
+    if not clear.any():
+        surf = img.convert()
+        if colorkey != None:
+            surf.set_colorkey(colorkey, pygame.RLEACCEL)
+        return [surf, "opaque"]
+    if colorkey == None:
+        return [img.convert_alpha(), "alpha"]
+
+    surf = img.convert()
+    surf.set_colorkey(None)
+    pixels = pygame.surfarray.pixels3d(surf)
+    pixels[clear] = colorkey
+    del pixels # Unlocks surf
+    surf.set_colorkey(colorkey, pygame.RLEACCEL)
+    return [surf, "colorkey"]
 
 class ImageManager:
     
@@ -230,6 +296,74 @@ class ImageManager:
         else:
             return [img_list, img_ids]
 
+    @staticmethod
+    def load_indexed(path, colorkey=None):
+        """
+        load an image as a PaletteSprite, falls back to a normal surface when it has more than 256 colours
+        """
+        img = ImageManager.load(path, colorkey)
+        sprite = PaletteSprite.from_surface(img)
+        if sprite == None:
+            return img
+        return sprite
+
+
+class PaletteSprite:
+    # An image kept as 8 bit palette indices, a recolour is the same indices with another palette.
+    # Variants are made once per colour set and kept, so drawing one allocates nothing.
+    def __init__(self, surface, key_index=None):
+        self.surface = surface
+        self.palette = [tuple(color)[:3] for color in surface.get_palette()]
+        self.key_index = key_index # Palette index of the colorkey, it stays transparent whatever colour it gets
+        self.variants = {}
+
+    @staticmethod
+    def from_surface(img):
+        # None if img can't be indexed: more than 256 colours or per pixel alpha
+        if img.get_flags() & pygame.SRCALPHA:
+            return None
+        pixels = pygame.surfarray.array3d(img)
+        colors, indices = np.unique(pixels.reshape(-1, 3), axis=0, return_inverse=True)
+        if len(colors) > 256:
+            return None
+
+        colors = [tuple(color) for color in colors.tolist()]
+        surf = pygame.Surface(img.get_size(), 0, 8)
+        surf.set_palette(colors + [(0, 0, 0)]*(256-len(colors)))
+        pygame.surfarray.blit_array(surf, indices.reshape(pixels.shape[:2]).astype(np.uint8))
+
+        key_index = None
+        colorkey = img.get_colorkey()
+        if colorkey != None and tuple(colorkey[:3]) in colors:
+            key_index = colors.index(tuple(colorkey[:3]))
+            surf.set_colorkey(key_index, pygame.RLEACCEL)
+        return PaletteSprite(surf, key_index)
+
+    def make_variant(self, palette):
+        surf = self.surface.copy()
+        surf.set_palette(palette)
+        if self.key_index != None:
+            surf.set_colorkey(self.key_index, pygame.RLEACCEL)
+        return surf
+
+    def recolor(self, mapping):
+        # mapping is {old colour: new colour}
+        mapping = {tuple(old)[:3]: tuple(new) for old, new in mapping.items()}
+        key = tuple(sorted(mapping.items()))
+        if key not in self.variants:
+            self.variants[key] = self.make_variant([mapping.get(color, color) for color in self.palette])
+        return self.variants[key]
+
+    def flat(self, color):
+        # Every opaque pixel in one colour, for flashes and silhouettes
+        key = ("flat", tuple(color))
+        if key not in self.variants:
+            palette = [tuple(color)]*len(self.palette)
+            if self.key_index != None:
+                palette[self.key_index] = self.palette[self.key_index]
+            self.variants[key] = self.make_variant(palette)
+        return self.variants[key]
+
 
 class Timer:
     def __init__(self, cooldown, callback=None):
@@ -273,6 +407,93 @@ class Timer:
                 if self.callback:
                     self.callback()
 
+class RotationCache:
+    # pygame.transform.rotate is slow enough to show up in the frame time when sprites turn every frame.
+    # Angles get snapped to step degrees so the results can be reused, prebaked ones are never dropped.
+    def __init__(self, step=2, capacity=512):
+        self.step = step
+        self.capacity = capacity
+        self.cache = OrderedDict() # (surface, flip_x, flip_y, angle) -> rotated surface
+        self.baked = {} # surface -> {(flip_x, flip_y, angle): rotated surface}
+        self.baked_names = {} # name -> the surface it prebaked, a set is kept while any name uses it
+
+        self.hits = 0
+        self.misses = 0
+
+    def snap(self, angle):
+        return round(angle/self.step)*self.step % 360
+
+    def rotate(self, surface, angle, flip_x=False, flip_y=False):
+        key = (surface, flip_x, flip_y, self.snap(angle))
+        rotations = self.baked.get(surface)
+        if rotations is not None and key[1:] in rotations:
+            self.hits += 1
+            return rotations[key[1:]]
+        if key in self.cache:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return self.cache[key]
+
+        self.misses += 1
+        rotated = self.render(*key)
+        self.cache[key] = rotated
+        while len(self.cache) > self.capacity:
+            self.cache.popitem(last=False)
+        return rotated
+
+    def render(self, surface, flip_x, flip_y, angle):
+        if flip_x or flip_y:
+            surface = pygame.transform.flip(surface, flip_x, flip_y)
+        return optimize_surface(pygame.transform.rotate(surface, angle))[0]
+
+    def prebake(self, name, surface, flip_x=False, flip_y=False):
+        # Every bucket of surface, for sprites that can point anywhere like the weapons. Names sharing a
+        # surface share its set, prebaking a name with another surface drops the old set once no name uses it
+        old = self.baked_names.get(name)
+        self.baked_names[name] = surface
+        if old is not None and old is not surface and all(used is not old for used in self.baked_names.values()):
+            del self.baked[old]
+
+        rotations = self.baked.setdefault(surface, {})
+        angle = 0
+        while angle < 360:
+            key = (flip_x, flip_y, self.snap(angle))
+            if key not in rotations:
+                rotations[key] = self.render(surface, *key)
+            angle += self.step
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits/total if total else 0
+
+rotation_cache = RotationCache()
+
+class OutlineCache:
+    # Outlines made by make_outline, least recently used get dropped past capacity
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self.cache = OrderedDict() # (surface, color, colorkey) -> outline surface
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, surface, color, colorkey=(0,0,0)):
+        key = (surface, tuple(color), tuple(colorkey))
+        if key in self.cache:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return self.cache[key]
+
+        self.misses += 1
+        outline = make_outline(surface, color, colorkey)
+        outline.set_colorkey((0,0,0), pygame.RLEACCEL) # Cached outlines never get drawn on
+        self.cache[key] = outline
+        while len(self.cache) > self.capacity:
+            self.cache.popitem(last=False)
+        return outline
+
+outline_cache = OutlineCache()
+
 class JSON_Handler:
     @staticmethod
     def load(file_path):
@@ -464,6 +685,9 @@ class Text:
         self.font = {}
         self.scale = scale
         self.y_size = 0
+        self.glyphs = {} # color -> recoloured font
+        self.palette_font = {} # char -> PaletteSprite, made the first time the font gets recoloured
+        self.sizes = {} # text -> get_size
         self.load_font()
 
     def load_font(self):
@@ -482,20 +706,30 @@ class Text:
                 current_char_width += 1
         self.y_size = font_image.get_height()
 
+    def get_glyphs(self, color=None):
+        # The font recoloured once per colour instead of every time a character gets drawn
+        if color == None:
+            return self.font
+        color = tuple(color)
+        if color not in self.glyphs:
+            if not self.palette_font:
+                self.palette_font = {char: PaletteSprite.from_surface(img) for char, img in self.font.items()}
+            self.glyphs[color] = {}
+            for char, sprite in self.palette_font.items():
+                if sprite != None:
+                    self.glyphs[color][char] = sprite.recolor({(255,0,0): color})
+                else:
+                    self.glyphs[color][char] = swap_color(self.font[char], (255,0,0), color)
+        return self.glyphs[color]
+
     def render(self,surf, text, x, y, color=None):
+        glyphs = self.get_glyphs(color)
+        blits = []
         spacing = 0
         y_offset = 0
         for index,char in enumerate(text):
-            if color != None:
-                if char not in [' ','\n']:
-                    char_img = swap_color(self.font[char], (255,0,0), color)
-            else:
-                if char not in [' ','\n']:
-                    char_img = self.font[char]
-
-            if char not in [' ','\n']:
-                surf.blit(char_img, (x+spacing, y+y_offset))
             if char not in [' ','\n']:
+                blits.append((glyphs[char], (x+spacing, y+y_offset)))
                 spacing += self.font[char].get_width() + self.spacing
             else:
                 spacing += self.font['A'].get_width()
@@ -503,9 +737,12 @@ class Text:
             if char == '\n':
                 y_offset += self.font['A'].get_height()+1
                 spacing = 0
-            
+        surf.fblits(blits)
 
     def get_size(self,text):
+        if text in self.sizes:
+            return list(self.sizes[text])
+
         width = 0
         height = self.font['A'].get_height()
         for char in text:
@@ -519,8 +756,78 @@ class Text:
                 width = 0
 
         width += (len(text)-1)*self.spacing
+        self.sizes[text] = (width, height)
         return [width, height]
 
+class TextCache:
+    # Strings rendered with a pygame font, a string is only rendered again after it drops out of the cache.
+    # Text whose value changes (FPS, coins) gets a new entry and the old one ages out.
+    def __init__(self, font, capacity=128):
+        self.font = font
+        self.capacity = capacity
+        self.cache = OrderedDict() # (text, color, antialias) -> Surface
+
+    def render(self, text, color=(255, 255, 255), antialias=False):
+        key = (text, tuple(color), antialias)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return self.cache[key]
+
+        surf = self.font.render(text, antialias, color)
+        self.cache[key] = surf
+        while len(self.cache) > self.capacity:
+            self.cache.popitem(last=False)
+        return surf
+
+    def size(self, text, color=(255, 255, 255), antialias=False):
+        return self.render(text, color, antialias).get_size()
+
+def make_variant(frame, flip_x=False, scale=1):
+    if scale != 1:
+        frame = pygame.transform.scale(frame, (frame.get_width()*scale, frame.get_height()*scale))
+    if flip_x:
+        frame = pygame.transform.flip(frame, True, False)
+    return frame
+
+def make_silhouette(frame, color=(255, 255, 255)):
+    if frame.get_colorkey() != None:
+        sprite = PaletteSprite.from_surface(frame)
+        if sprite != None:
+            return sprite.flat(color)
+
+    mask = pygame.mask.from_surface(frame)
+    silhouette = mask.to_surface(pygame.Surface(frame.get_size()), setcolor=color, unsetcolor=(0, 0, 0))
+    silhouette.set_colorkey((0, 0, 0), pygame.RLEACCEL)
+    return silhouette
+
+class SilhouetteCache:
+    # Hurt flash silhouettes made by make_silhouette, shared by every entity drawing the same frame.
+    # Frames with no colorkey or alpha are solid, so those are shared by size. Least recently used
+    # get dropped past capacity.
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self.cache = OrderedDict() # (frame or size, color) -> silhouette surface
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, frame, color=(255, 255, 255)):
+        solid = frame.get_colorkey() == None and not frame.get_flags() & pygame.SRCALPHA
+        key = (frame.get_size() if solid else frame, tuple(color))
+        if key in self.cache:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return self.cache[key]
+
+        self.misses += 1
+        silhouette = make_silhouette(frame, color)
+        self.cache[key] = silhouette
+        while len(self.cache) > self.capacity:
+            self.cache.popitem(last=False)
+        return silhouette
+
+silhouette_cache = SilhouetteCache()
+
 class Animation:
     def __init__(self):
         self.anim_database = {}
@@ -530,6 +837,7 @@ class Animation:
         self.loop = True
         self.end_of_anim = False
         self.states = []
+        self.variants = {} # (frame, flip_x, scale) -> Surface, shared by every Animation of the same asset
 
     def load_anim(self, frames, anim_name, frame_duration):
         self.anim_database[anim_name] = {"frame_timer": Timer(frame_duration)}
@@ -546,6 +854,18 @@ class Animation:
 
     def set_loop(self, flag: bool):
         self.loop = flag
+
+    def set_variants(self, variants):
+        self.variants = variants
+
+    def variant(self, frame, flip_x=False, scale=1):
+        # Flipped/scaled copy of a frame, made once instead of every time it gets drawn
+        if not flip_x and scale == 1:
+            return frame
+        key = (frame, flip_x, scale)
+        if key not in self.variants:
+            self.variants[key] = optimize_surface(make_variant(frame, flip_x, scale))[0]
+        return self.variants[key]
     
     def set_frame(self, index):
         self.frame_count = index
@@ -1,5 +1,14 @@
-from .window import Window
-from .game_manager import GameManager as GM
-from .assets import Assets
+import importlib
 
+# The game's classes are imported on first use so the level tools can import scripts.level without
+# pulling in pygame
+LAZY = {"Window": (".window", "Window"), "GM": (".game_manager", "GameManager"), "Assets": (".assets", "Assets")}
 
+
+def __getattr__(name):
+    if name not in LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module, attr = LAZY[name]
+    value = getattr(importlib.import_module(module, __name__), attr)
+    globals()[name] = value
+    return value
@@ -19,14 +19,24 @@ frame_times = {
     }
 }
 
+# Scales an entity draws an animation at besides 1, their frames get made at load time along with the flipped ones
+anim_scales = {
+    "dummy": [2]
+}
+
+COLORKEY = (0, 0, 0) # See through in every asset
+
 class Assets:
     def __init__(self):
         self.images =  {}
+        self.palette_sprites = {}
+        self.blit_formats = {} # asset name -> kind optimize_surface picked for it
         self.audio = {
             "music": {}, "sfx": {}
         }
 
         self.animations = {}
+        self.animation_variants = {} # anim_id -> variants shared by its Animation objects
         self.tilesets = {}
         self.weapon_data = {}
 
@@ -42,15 +52,15 @@ class Assets:
         files = os.listdir(path + "weapons/")
 
         for filename in files:
-            img = E.ImageManager.load(path + "weapons/" + filename, (0, 0, 0))
-            self.images[filename.split(".")[0]] = img
+            img = pygame.image.load(path + "weapons/" + filename)
+            self.images[filename.split(".")[0]] = self.optimize(filename.split(".")[0], img)
 
         files = os.listdir(path)
         for filename in files:
             if len(filename.split(".")) > 1:
                 if filename.split(".")[-1] == "png":
-                    img = E.ImageManager.load(path+filename, (0, 0, 0))
-                    self.images[filename.split(".")[0]] = img
+                    img = pygame.image.load(path+filename)
+                    self.images[filename.split(".")[0]] = self.optimize(filename.split(".")[0], img)
     
     def load_animations(self):
         path = "data/images/animations/"
@@ -67,8 +77,27 @@ class Assets:
 
                 img_list = os.listdir(path+f"{animation}/"+state)
                 for filename in img_list:
-                    img = E.ImageManager.load(path+f"{animation}/"+state+"/"+filename, (0, 0, 0))
-                    self.animations[animation][state].append(img)
+                    img = pygame.image.load(path+f"{animation}/"+state+"/"+filename)
+                    self.animations[animation][state].append(self.optimize(f"{animation}/{state}/{filename}", img))
+
+            self.animation_variants[animation] = {}
+            for scale in [1] + anim_scales.get(animation, []):
+                for frames in self.animations[animation].values():
+                    for frame in frames:
+                        for flip_x in [False, True]:
+                            if scale != 1 or flip_x:
+                                self.animation_variants[animation][(frame, flip_x, scale)] = E.optimize_surface(E.make_variant(frame, flip_x, scale))[0]
+
+    def animation_memory(self):
+        # Bytes used by the animation frames and by their variants
+        frames = 0
+        for animation in self.animations.values():
+            for state in animation.values():
+                frames += sum(frame.get_width()*frame.get_height()*frame.get_bytesize() for frame in state)
+        variants = 0
+        for animation in self.animation_variants.values():
+            variants += sum(frame.get_width()*frame.get_height()*frame.get_bytesize() for frame in animation.values())
+        return [frames, variants]
 
     def load_tilesets(self):
         path = "data/images/tilesets/"
@@ -83,30 +112,35 @@ class Assets:
             file_type = filename.split(".")[1]
 
             if file_type == "png":
-                image = E.ImageManager.load(path+filename, (0, 0, 0))
+                image = pygame.image.load(path+filename)
                 tileset = filename.split(".")[0]
                 self.tilesets[tileset] = {}
 
                 for i in range(int(image.get_height()/TILESIZE)):
                     for j in range(int(image.get_width()/TILESIZE)):
-                        img = E.ImageManager.get_image(image, j*TILESIZE, i*TILESIZE, TILESIZE, TILESIZE, 1)
-
-                        self.tilesets[tileset][tile_id] = img
+                        img = image.subsurface((j*TILESIZE, i*TILESIZE, TILESIZE, TILESIZE))
+                        self.tilesets[tileset][tile_id] = self.optimize(f"{tileset}/{tile_id}", img)
                         tile_id += 1
             elif file_type == "json":
                 with open(path+filename) as file:
                     data = json.load(file)
                     file.close()
 
-                image = E.ImageManager.load(data["path"], (0, 0, 0))
+                image = pygame.image.load(data["path"])
                 tileset = filename.split(".")[0]
                 self.tilesets[tileset] = {}
 
                 for tile_id in data:
                     if tile_id != "path":
                         tile = data[tile_id]
-                        img = E.ImageManager.get_image(image, tile["x"], tile["y"], tile["width"], tile["height"], 1)
-                        self.tilesets[tileset][tile_id] = img
+                        img = image.subsurface((tile["x"], tile["y"], tile["width"], tile["height"]))
+                        self.tilesets[tileset][tile_id] = self.optimize(f"{tileset}/{tile_id}", img)
+
+    def optimize(self, name, img):
+        # img straight from pygame.image.load, so its alpha still counts
+        img, kind = E.optimize_surface(img, COLORKEY)
+        self.blit_formats[name] = kind
+        return img
 
     def load_weapon_data(self):
         with open("data/game_data/weapon_data.json") as file:
@@ -142,6 +176,12 @@ class Assets:
             surf.fill((255, 0, 0))
             return surf
     
+    def get_palette_sprite(self, img_id):
+        # 8 bit copy of an image for cheap recolouring (teams, elements, flashes), None if it can't be indexed
+        if img_id not in self.palette_sprites:
+            self.palette_sprites[img_id] = E.PaletteSprite.from_surface(self.get_image(img_id))
+        return self.palette_sprites[img_id]
+
     def get_animation(self, anim_id):
         if anim_id in self.animations:
             return self.animations[anim_id]
@@ -157,5 +197,6 @@ class Assets:
                 frame_time = 0.1
 
             animation.load_anim(anim[state], state, frame_time)
+        animation.set_variants(self.animation_variants[anim_id])
         
         return animation
\ No newline at end of file
@@ -0,0 +1,150 @@
+import numpy as np
+
+# Neighbour bits of a cell's mask. The 4 neighbour masks only use the first four,
+# corners are only set when both edges next to them are, so 8 neighbours give 47 distinct masks.
+N = 1
+E = 2
+S = 4
+W = 8
+NE = 16
+SE = 32
+SW = 64
+NW = 128
+
+# auto_tile_rules in a level file look like
+#   {tileset: {"layer": "tiles", "neighbours": 4, "ignore": [16, 17], "default": 5, "tiles": {mask: tile_id}}}
+# Every tile of the tileset connects to its neighbours apart from the ignored ones, but only cells
+# holding one of the rule's own tile ids get replaced. Masks without a tile id keep the cell as it is
+# unless the rule has a default. "layer" is optional, without it the rule applies to every layer.
+
+
+def neighbour_masks(member, neighbours=4):
+    # member is a bool grid, returns the neighbour mask of every cell
+    height, width = member.shape
+    padded = np.zeros((height+2, width+2), dtype=bool)
+    padded[1:-1, 1:-1] = member
+
+    n = padded[:-2, 1:-1]
+    e = padded[1:-1, 2:]
+    s = padded[2:, 1:-1]
+    w = padded[1:-1, :-2]
+    mask = n*np.uint8(N) | e*np.uint8(E) | s*np.uint8(S) | w*np.uint8(W)
+
+    if neighbours == 8:
+        mask |= (n & e & padded[:-2, 2:])*np.uint8(NE)
+        mask |= (s & e & padded[2:, 2:])*np.uint8(SE)
+        mask |= (s & w & padded[2:, :-2])*np.uint8(SW)
+        mask |= (n & w & padded[:-2, :-2])*np.uint8(NW)
+
+    return mask.astype(np.uint8)
+
+
+class AutoTileRule:
+    def __init__(self, tileset, layer, neighbours, member, target, lut):
+        self.tileset = tileset
+        self.layer = layer
+        self.neighbours = neighbours
+        self.member = member # palette ref -> connects to its neighbours
+        self.target = target # palette ref -> gets replaced
+        self.lut = lut # mask -> palette ref, 0 keeps the cell
+
+    def applies_to(self, layer):
+        return self.layer is None or self.layer == layer
+
+    def retile(self, grid):
+        # Retiles a whole grid in place, returns how many cells changed
+        member = self.member[grid]
+        masks = neighbour_masks(member, self.neighbours)
+        refs = self.lut[masks]
+
+        changed = self.target[grid] & (refs != 0) & (refs != grid)
+        grid[changed] = refs[changed]
+        return int(np.count_nonzero(changed))
+
+    def retile_cell(self, grid, gx, gy):
+        # Retiles the 3x3 cells around grid cell gx, gy after it changed.
+        # Returns [gx, gy, ref] for every cell that got a new tile.
+        height, width = grid.shape
+        x0 = max(gx-2, 0)
+        y0 = max(gy-2, 0)
+        x1 = min(gx+3, width)
+        y1 = min(gy+3, height)
+
+        window = grid[y0:y1, x0:x1]
+        masks = neighbour_masks(self.member[window], self.neighbours)
+        refs = self.lut[masks]
+
+        changes = []
+        for y in range(max(gy-1, 0), min(gy+2, height)):
+            for x in range(max(gx-1, 0), min(gx+2, width)):
+                wx = x - x0
+                wy = y - y0
+                ref = int(refs[wy, wx])
+                old = int(window[wy, wx])
+                if ref and ref != old and self.target[old]:
+                    window[wy, wx] = ref
+                    changes.append([x, y, ref])
+        return changes
+
+
+class AutoTiler:
+    # Builds a lookup table per rule over a level's palette. Tiles the rules can place but the
+    # level doesn't use yet are appended to the palette (and the tileset list) passed in.
+    def __init__(self, rules, palette, tilesets):
+        self.rules = []
+
+        refs = {entry: ref for ref, entry in enumerate(palette) if entry is not None}
+        def get_ref(tileset, tile_id):
+            ref = refs.get((tileset, tile_id))
+            if ref is None:
+                if tileset not in tilesets:
+                    tilesets.append(tileset)
+                ref = len(palette)
+                refs[(tileset, tile_id)] = ref
+                palette.append((tileset, tile_id))
+            return ref
+
+        for tileset, rule in rules.items():
+            neighbours = int(rule.get("neighbours", 4))
+            lut = np.zeros(256 if neighbours == 8 else 16, dtype=np.uint16)
+            if "default" in rule:
+                lut[:] = get_ref(tileset, int(rule["default"]))
+
+            tile_ids = set()
+            for mask, tile_id in rule["tiles"].items():
+                lut[int(mask)] = get_ref(tileset, int(tile_id))
+                tile_ids.add(int(tile_id))
+            if "default" in rule:
+                tile_ids.add(int(rule["default"]))
+            ignore = rule.get("ignore", [])
+
+            self.rules.append([tileset, rule.get("layer"), neighbours, lut, tile_ids, ignore])
+
+        # Only built once every rule had the chance to grow the palette
+        self.rules = [self._build(palette, *rule) for rule in self.rules]
+
+    @staticmethod
+    def _build(palette, tileset, layer, neighbours, lut, tile_ids, ignore):
+        member = np.zeros(len(palette), dtype=bool)
+        target = np.zeros(len(palette), dtype=bool)
+        for ref, entry in enumerate(palette):
+            if entry is not None and entry[0] == tileset:
+                member[ref] = entry[1] not in ignore
+                target[ref] = entry[1] in tile_ids
+        return AutoTileRule(tileset, layer, neighbours, member, target, lut)
+
+    def retile(self, layers):
+        # Retiles every layer grid in place, returns how many cells changed
+        changed = 0
+        for layer, grid in layers.items():
+            for rule in self.rules:
+                if rule.applies_to(layer):
+                    changed += rule.retile(grid)
+        return changed
+
+    def retile_cell(self, layer, grid, gx, gy):
+        changes = []
+        for rule in self.rules:
+            if rule.applies_to(layer):
+                changes += rule.retile_cell(grid, gx, gy)
+        return changes
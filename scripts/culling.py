@@ -0,0 +1,38 @@
+import pygame
+
+
+class Culler:
+    # Decides what gets drawn from the camera's scroll and the display size. Anything whose bounds miss
+    # the view grown by margin on every side is skipped, margin covers sprites drawn past their rect.
+    def __init__(self, size, margin=32):
+        self.size = size
+        self.margin = margin
+        self.view = pygame.FRect(0, 0, size[0], size[1])
+
+        self.drawn = {} # kind -> count of this frame
+        self.culled = {}
+
+    def update(self, scroll):
+        self.view = pygame.FRect(scroll[0]-self.margin, scroll[1]-self.margin, self.size[0]+self.margin*2, self.size[1]+self.margin*2)
+        self.drawn = {}
+        self.culled = {}
+
+    def count(self, kind, drawn, culled):
+        self.drawn[kind] = self.drawn.get(kind, 0) + drawn
+        self.culled[kind] = self.culled.get(kind, 0) + culled
+
+    def visible(self, rect, kind="other"):
+        if self.view.colliderect(rect):
+            self.count(kind, 1, 0)
+            return True
+        self.count(kind, 0, 1)
+        return False
+
+    def query(self, items, kind="other", get_bounds=lambda item: item.rect):
+        # The items that intersect the view, in their original order
+        hits = self.view.collidelistall([get_bounds(item) for item in items])
+        self.count(kind, len(hits), len(items)-len(hits))
+        return [items[i] for i in hits]
+
+    def totals(self):
+        return [sum(self.drawn.values()), sum(self.culled.values())]
@@ -6,6 +6,7 @@ from scripts.entity import HurtableEntity
 from scripts.weapon import Slash
 from scripts.misc import Coin
 from scripts.projectile import *
+from scripts.render_queue import draw_shape
 
 vec2 = pygame.Vector2
 
@@ -64,6 +65,10 @@ class Enemy(HurtableEntity):
     def run_ai(self, target, tiles):
         pass
 
+    def get_bounds(self):
+        # Area draw() can touch, used for culling
+        return self.rect
+
     def update(self, target, tiles=[], ramps=[]):
         super().update()
         self.run_ai(target, tiles)
@@ -144,7 +149,7 @@ class Drone(Enemy):
         if not self.attacking and self.clear_to_attack:
             surf = pygame.Surface((10, 10))
             surf.fill((255, 0, 0))
-            self.game.projectiles.append(PhysicsProjectile(surf, self, self.dmg, self.rect.centerx, self.rect.centery, 10, 10, 0.2, [2.7*direction, 1.2]))
+            self.game.projectiles.append(PhysicsProjectile(surf, self, self.dmg, self.rect.centerx, self.rect.centery, 10, 10, 0.2, [2.7*direction, 1.2], (255, 60, 60)))
             self.attack_timer.set()
             self.attacking = True
 
@@ -164,8 +169,7 @@ class Dummy(Enemy):
         self.state = "idle"
 
     def draw(self, surf, scroll):
-        self.image = self.animation.animate(self.state, True)
-        self.image = pygame.transform.flip(pygame.transform.scale(self.image, (self.image.get_width()*2, self.image.get_height()*2)), self.flip, False)
+        self.image = self.animation.variant(self.animation.animate(self.state, True), self.flip, 2)
 
         #E.perfect_outline(pygame.transform.scale(self.image, (self.image.get_width()*2, self.image.get_height()*2)), surf, (self.x-scroll[0], self.y-scroll[1]-14), (255, 0, 0))
         surf.blit(self.image, (self.x-scroll[0], self.y-scroll[1]-14))
@@ -206,9 +210,12 @@ class Roller(Enemy):
     def draw(self, surf, scroll):
         super().draw(surf, scroll)
 
-        pygame.draw.rect(surf, (255, 0, 0), (self.line_of_sight_rect.x-scroll[0], self.line_of_sight_rect.y-scroll[1], self.line_of_sight_rect.width, self.line_of_sight_rect.height), 1)
+        draw_shape(surf, pygame.draw.rect, (255, 0, 0), (self.line_of_sight_rect.x-scroll[0], self.line_of_sight_rect.y-scroll[1], self.line_of_sight_rect.width, self.line_of_sight_rect.height), 1)
 
         self.draw_damage_mask(surf, scroll)
+
+    def get_bounds(self):
+        return self.rect.union(self.line_of_sight_rect)
     
     def move(self, tiles, ramps):
         self.movement = [0, 0]
@@ -383,10 +390,14 @@ class LazerOrb(Enemy):
         super().draw(surf, scroll)
 
         color = (255, 255, 0)
-        pygame.draw.line(surf, color, (self.rect.centerx-scroll[0], self.rect.centery-scroll[1]), (self.target_pos[0]-scroll[0], self.target_pos[1]-scroll[1]), 1)
+        draw_shape(surf, pygame.draw.line, color, (self.rect.centerx-scroll[0], self.rect.centery-scroll[1]), (self.target_pos[0]-scroll[0], self.target_pos[1]-scroll[1]), 1)
 
         self.draw_damage_mask(surf, scroll)
 
+    def get_bounds(self):
+        # The aim line reaches the target
+        return self.rect.union(pygame.FRect(self.target_pos, (1, 1)))
+
     def run_ai(self, target, tiles=[]):
         if self.aiming:
             self.target_pos = list(target.rect.center)
@@ -1,5 +1,4 @@
-import pygame
-from scripts.Engine import Entity, Timer
+from scripts.Engine import Entity, Timer, silhouette_cache
 
 
 class HurtableEntity(Entity):
@@ -18,9 +17,7 @@ class HurtableEntity(Entity):
     def draw_damage_mask(self, surf, scroll=[0, 0]):
         # Damage mask
         if self.hurt and self.draw_mask:
-            mask = pygame.mask.from_surface(self.image)
-            img = mask.to_surface(unsetcolor=(0, 0, 0, 0), setcolor=(255, 255, 255, 255))
-            surf.blit(img, (self.rect.x-scroll[0], self.rect.y-scroll[1]))
+            surf.blit(silhouette_cache.get(self.image), (self.rect.x-scroll[0], self.rect.y-scroll[1]))
     
     def die(self):
         self.alive = False
@@ -1,11 +1,20 @@
 import pygame
-import json
 import math
 import time
 import scripts.Engine as E
+import scripts.level as L
 
 from scripts.player import Player
 from scripts.misc import Coin
+from scripts.tilemap import TileMap
+from scripts.streaming import LevelStreamer
+from scripts.preload import LevelPreloader
+from scripts.render_cache import LayerCache, draw_tiles
+from scripts.render_queue import RenderQueue, draw_shape
+from scripts.culling import Culler
+from scripts.parallax import ParallaxBackground, ParallaxLayer
+from scripts.lighting import LightMap
+from scripts.hot_reload import LevelWatcher, ReloadPatch, remap_palette, diff_layers, object_key
 from scripts.weapon import *
 from scripts.enemy import *
 
@@ -32,6 +41,19 @@ class LevelInfo:
     def save_info(self):
         pass
 
+class PreparedLevel:
+    def __init__(self, path):
+        self.path = path
+        self.level = None
+        self.tiles = None
+        self.streamer = None
+        self.bounds = []
+        self.tile_images = []
+        self.layer_overhang = {}
+        self.spawn_pos = [0, 0]
+        self.enemies = [] # Level objects to spawn once the level is in play
+        self.battle_rooms = []
+
 class GameManager:
     def __init__(self, game):
         self.game = game
@@ -48,13 +70,30 @@ class GameManager:
         self.save_data = {}
         self.level_info = LevelInfo()
 
-        self.level = {}
-        self.tiles = {}
-        self.ramps = {"l_ramps": {}, "r_ramps": {}} # tiles 16, 17
+        self.level = None
+        self.tiles = None # Collision grid of the "tiles" layer, ramps are tiles 16, 17
+        self.tile_images = [] # Tile surfaces indexed by the level's palette refs
+        self.layer_overhang = {} # How many tiles the largest sprite of a layer reaches past its cell
+        self.merge_collision_rects = True # Merge solid tiles into bigger rects at load, see TileMap.merge_solids
+        self.streaming = False # Stream big levels in chunks around the camera, see LevelStreamer
+        self.streamer = None
+        self.bake_layers = True # Draw static layers from baked chunk surfaces, see LayerCache
+        self.layer_cache = None
         self.camera_bounds = []
         self.current_level = 1
 
         self.render_layers = ["background", "decor", "tiles", "enemies", "player", "attacks", "foreground"]
+        self.render_queue = RenderQueue(self.render_layers, self.win_surf.get_size())
+        self.culler = Culler(self.win_surf.get_size())
+
+        self.sky_color = (127, 127, 127)
+        self.background = ParallaxBackground(self.win_surf.get_size(), [
+            ParallaxLayer(self.game.assets.get_image("mountain"), 0.1),
+            ParallaxLayer(self.game.assets.get_image("bg_trees"), 0.3),
+        ])
+
+        self.lighting = LightMap(self.win_surf.get_size())
+        self.lighting_enabled = False # Opt in with F4, it tints the whole scene down to the ambient light
 
         self.slashes = []
         self.enemies = []
@@ -71,6 +110,18 @@ class GameManager:
         self.current_battle_room = -1
 
         self.spawn_pos = [0, 0]
+        self.player = None
+
+        self.preloader = LevelPreloader(self.prepare_level)
+        self.level_swap_time = 0 # Seconds the last swap_level() spent on the main thread
+
+        self.level_path = ""
+        self.hot_reload = False # Watch the level file and patch edits in while playing, toggled with F5
+        self.watcher = None
+        self.reloader = LevelPreloader(self.prepare_reload)
+        self.level_reload_time = 0
+        self.reload_error = None # Why the last reload failed, shown in the F3 overlay
+
         self.load_level("data/levels/debug_arena.lvl")
         self.player = Player(self, self.spawn_pos[0], self.spawn_pos[1], TILESIZE, TILESIZE, 3.4, 7.5, 0.32, 100)
         self.player.animation = self.game.assets.create_animation_object("player")
@@ -80,6 +131,7 @@ class GameManager:
 
         # Debug stuff
         self.debug_font = pygame.font.SysFont("Verdana", 15, True)
+        self.text_cache = E.TextCache(self.debug_font)
         self.debug = False
     
 
@@ -88,9 +140,6 @@ class GameManager:
         self.battle_enemy_count = len(battle_room["enemies"][self.current_wave])
         self.wave_count = int(battle_room["wave_count"])
 
-        for exit in battle_room["exits"]:
-            self.tiles[exit[1]] = exit[0]
-
         for enemy in battle_room["enemies"][self.current_wave]:
             if enemy[1] == "drone":
                 e = Drone(self, enemy[0][0], enemy[0][1], TILESIZE*2, TILESIZE*2, self.game.assets.get_image("drone"))
@@ -103,91 +152,277 @@ class GameManager:
         self.current_wave = -1
         self.current_battle_room = -1
 
-        for exit in battle_room["exits"]:
-            del self.tiles[exit[1]]
+    def prepare_level(self, level):
+        # Loads and builds everything a level needs without touching the running game,
+        # so it can run on the preloader's worker thread
+        prepared = PreparedLevel(level)
+        streaming = self.streaming
+
+        data = L.load_level(level, stream=streaming)
+        prepared.level = data
+        prepared.bounds = list(data.bounds)
+
+        if streaming:
+            prepared.streamer = LevelStreamer(data, merge=self.merge_collision_rects)
+            prepared.tiles = prepared.streamer
+        else:
+            prepared.tiles = TileMap.from_level(data)
+            if self.merge_collision_rects:
+                prepared.tiles.merge_solids()
+
+        prepared.tile_images = [None]
+        for tileset, tile_id in data.palette[1:]:
+            prepared.tile_images.append(self.game.assets.get_tile(tileset, tile_id))
+
+        for layer in data.layer_names:
+            overhang = [0, 0]
+            # Finding the refs of a layer reads its whole grid, which streaming avoids
+            refs = range(1, len(data.palette)) if streaming else data.layer_refs(layer)
+            for ref in refs:
+                img = prepared.tile_images[ref]
+                overhang[0] = max(overhang[0], math.ceil(img.get_width()/TILESIZE)-1)
+                overhang[1] = max(overhang[1], math.ceil(img.get_height()/TILESIZE)-1)
+            prepared.layer_overhang[layer] = overhang
+
+        # The compiler already resolved which objects are what, see level.resolve_objects
+        objects = data.objects
+        if data.spawn != -1:
+            prepared.spawn_pos = objects[data.spawn]["rect"][:2]
+
+        for i in data.enemy_objects:
+            if prepared.streamer is not None:
+                # Spawned once the chunk it is in gets close to the camera
+                prepared.streamer.add_object(objects[i])
+            else:
+                prepared.enemies.append(objects[i])
 
-    def load_level(self, level):
-        exclude_list = ["tree 1", "tree 2", 16, 17]
+        prepared.battle_rooms = self.build_battle_rooms(data)
 
-        self.level_info.set_level(level.split("/")[-1].split(".")[0])
+        return prepared
 
-        with open(level) as file:
-            data = json.load(file)
-            file.close()
+    def build_battle_rooms(self, data):
+        objects = data.objects
+        battle_rooms = []
+        for b_room in data.battle_rooms:
+            obj = objects[b_room["object"]]
+            room = {"rect": pygame.Rect(obj["rect"]), "exits": [], "enemies": [], "wave_count": b_room["waves"], "key": object_key(obj)}
+            for i in b_room["exits"]:
+                room["exits"].append([pygame.Rect(objects[i]["rect"]), objects[i]["name"]])
 
-        self.level = data["level"]
+            for group in b_room["enemies"]:
+                room["enemies"].append([[objects[i]["rect"], objects[i]["properties"]["enemy"]] for i in group])
 
-        for tile_id in self.level["tiles"]:
-            tile = self.level["tiles"][tile_id]
-            if tile[1] not in exclude_list:
-                self.tiles[tile_id] = pygame.Rect(tile[2][0]*TILESIZE, tile[2][1]*TILESIZE, TILESIZE, TILESIZE)
-            if tile[1] == 16:
-                self.ramps["r_ramps"][tile_id] = pygame.Rect(tile[2][0]*TILESIZE, tile[2][1]*TILESIZE, TILESIZE, TILESIZE)
-            if tile[1] ==  17:
-                self.ramps["l_ramps"][tile_id] = pygame.Rect(tile[2][0]*TILESIZE, tile[2][1]*TILESIZE, TILESIZE, TILESIZE)
+            battle_rooms.append(room)
+        return battle_rooms
 
-        self.bounds = [data["bounds"]["left"], data["bounds"]["top"], data["bounds"]["right"], data["bounds"]["bottom"]]
+    def install_level(self, prepared):
+        # Swaps the prepared level in on the main thread, between frames
+        if self.level is not None:
+            self.level.close()
 
-        for obj in data["objects"]:
-            # do stuff
-            if obj["name"] == "Spawn":
-                self.spawn_pos = [obj["rect"][0], obj["rect"][1]]
-            
-            if obj["name"] == "Dummy":
-                self.enemies.append(Dummy(self, obj["rect"][0], obj["rect"][1], TILESIZE*2, TILESIZE*2, self.game.assets.create_animation_object("dummy")))
+        self.level_info.set_level(L.level_name(prepared.path))
+        self.level_path = prepared.path
+        self.watcher = LevelWatcher(prepared.path)
 
-            if obj["name"] == "drone":
-                self.enemies.append(Drone(self, obj["rect"][0], obj["rect"][1], TILESIZE*2, TILESIZE*2, self.game.assets.get_image("drone")))
-            
-            if obj["name"] == "Roller":
-                self.enemies.append(Roller(self, obj["rect"][0], obj["rect"][1], TILESIZE*3, TILESIZE*3))
-            
-            if obj["name"] == "Lazer Orb":
-                self.enemies.append(LazerOrb(self, obj["rect"][0], obj["rect"][1], TILESIZE, TILESIZE))
-            
-            if obj["name"] == "BattleRoom":
-                room = {"rect": pygame.Rect(obj["rect"]), "exits": [], "enemies": [], "wave_count": int(obj["properties"]["waves"])}
-                for exit in obj["properties"]["exits"].split(","):
-                    for _obj in data["objects"]:
-                        if _obj["name"] == exit:
-                            room["exits"].append([pygame.Rect(_obj["rect"]), exit])
-                
-                for i, waves in enumerate(obj["properties"]["enemy_ids"].split(";")):
-                    room["enemies"].append([])
-                    for enemy_id in waves.split(","):
-                        for _obj in data["objects"]:
-                            if _obj["name"] == enemy_id:
-                                room["enemies"][i].append([_obj["rect"], _obj["properties"]["enemy"]])
-                
-                self.battle_rooms.append(room)
-        
-    def get_tiles_near_object(self, pos, tile_radius):
-        tile_x = int(pos[0]/TILESIZE)
-        tile_y = int(pos[1]/TILESIZE)
-
-        tiles = []
-        l_ramps = []
-        r_ramps = []
-        for i in range(-tile_radius, tile_radius+1):
-            for j in range(-tile_radius, tile_radius+1):
-                tile_id = f"{tile_x+j}/{tile_y+i}"
-
-                if tile_id in self.tiles:
-                    tiles.append(self.tiles[tile_id])
+        self.level = prepared.level
+        self.tiles = prepared.tiles
+        self.streamer = prepared.streamer
+        self.bounds = prepared.bounds
+        self.tile_images = prepared.tile_images
+        self.layer_overhang = prepared.layer_overhang
+        self.spawn_pos = prepared.spawn_pos
+
+        self.layer_cache = None
+        if self.bake_layers:
+            self.layer_cache = LayerCache(self.streamer if self.streamer is not None else self.level, self.tile_images, self.layer_overhang)
+
+        self.slashes = []
+        self.enemies = []
+        self.projectiles = []
+        self.particles = []
+        self.coins = []
+
+        self.battle_rooms = prepared.battle_rooms
+        self.in_battle = False
+        self.battle_enemy_count = 0
+        self.wave_count = 0
+        self.current_wave = 0
+        self.current_battle_room = -1
+
+        for obj in prepared.enemies:
+            self.spawn_object(obj)
+
+        if self.player is not None:
+            self.player.set_pos(self.spawn_pos[0], self.spawn_pos[1])
+            self.player.movement = [0, 0]
+            self.player.vel_y = 0
+
+    def load_level(self, level):
+        self.install_level(self.prepare_level(level))
+
+    def preload_level(self, level):
+        # Starts preparing a level in the background, swap_level() puts it in play
+        self.preloader.start(level)
+
+    def level_ready(self):
+        return self.preloader.ready()
+
+    def swap_level(self):
+        # Waits for the preloaded level if it isn't done yet, the wait isn't counted in level_swap_time
+        prepared = self.preloader.take()
+
+        start = time.perf_counter()
+        self.install_level(prepared)
+        self.level_swap_time = time.perf_counter() - start
+
+    def spawn_object(self, obj):
+        enemy = None
+        if obj["name"] == "Dummy":
+            enemy = Dummy(self, obj["rect"][0], obj["rect"][1], TILESIZE*2, TILESIZE*2, self.game.assets.create_animation_object("dummy"))
+
+        if obj["name"] == "drone":
+            enemy = Drone(self, obj["rect"][0], obj["rect"][1], TILESIZE*2, TILESIZE*2, self.game.assets.get_image("drone"))
         
-        for i in range(-tile_radius, tile_radius+1):
-            for j in range(-tile_radius, tile_radius+1):
-                tile_id = f"{tile_x+j}/{tile_y+i}"
-
-                if tile_id in self.ramps["r_ramps"]:
-                    r_ramps.append(self.ramps["r_ramps"][tile_id])
-                elif tile_id in self.ramps["l_ramps"]:
-                    l_ramps.append(self.ramps["l_ramps"][tile_id])
-                
+        if obj["name"] == "Roller":
+            enemy = Roller(self, obj["rect"][0], obj["rect"][1], TILESIZE*3, TILESIZE*3)
         
+        if obj["name"] == "Lazer Orb":
+            enemy = LazerOrb(self, obj["rect"][0], obj["rect"][1], TILESIZE, TILESIZE)
+
+        if enemy is not None:
+            enemy.level_object = object_key(obj) # So a hot reload can tell which enemies were removed
+            self.enemies.append(enemy)
+
+    def prepare_reload(self, path):
+        # Runs on the reloader's worker thread: parses the edited level and diffs it against the running one
+        patch = ReloadPatch(path, L.parse_json(path))
+        level = patch.level
+
+        patch.added_refs = remap_palette(self.level.palette, level)
+        for ref in patch.added_refs:
+            patch.tile_images.append(self.game.assets.get_tile(*level.palette[ref]))
+
+        if self.streamer is None:
+            patch.cells = diff_layers(self.level, level)
+            if patch.cells is None:
+                patch.tiles = TileMap.from_level(level)
+                if self.merge_collision_rects:
+                    patch.tiles.merge_solids()
+        return patch
+
+    def apply_reload(self, patch):
+        # Patches the changed cells and objects in, the player, camera and everything else keeps going
+        old = self.level
+        new = patch.level
+
+        self.tile_images += patch.tile_images
+        for layer in new.layers:
+            overhang = self.layer_overhang.setdefault(layer, [0, 0])
+            for img in patch.tile_images:
+                overhang[0] = max(overhang[0], math.ceil(img.get_width()/TILESIZE)-1)
+                overhang[1] = max(overhang[1], math.ceil(img.get_height()/TILESIZE)-1)
+
+        old_enemies = {object_key(old.objects[i]): old.objects[i] for i in old.enemy_objects}
+        old_rooms = {object_key(old.objects[room["object"]]) for room in old.battle_rooms}
+
+        if self.streamer is not None:
+            old.close()
+            self.streamer.reload(new)
+            self.level = new
+        elif patch.cells is None:
+            self.level = new
+            self.tiles = patch.tiles
+            if self.layer_cache is not None:
+                self.layer_cache.source = new
+        else:
+            old.palette = new.palette
+            old.palette_flags = new.palette_flags
+            self.tiles.flag_table = new.palette_flags
+            for layer, cells in patch.cells.items():
+                if layer == self.tiles.layer:
+                    self.tiles.set_tiles(cells)
+                else:
+                    grid = old.layers[layer]
+                    for x, y, ref in cells:
+                        grid[y-old.origin[1], x-old.origin[0]] = ref
+
+            old.objects = new.objects
+            old.spawn, old.enemy_objects, old.battle_rooms = new.spawn, new.enemy_objects, new.battle_rooms
+            old.bounds = new.bounds
+            old.size = new.size
+
+        if self.layer_cache is not None:
+            # New sprites can reach further than the overhang the chunks were baked with
+            if patch.cells is None or patch.tile_images:
+                self.layer_cache.clear()
+            else:
+                for layer, cells in patch.cells.items():
+                    self.layer_cache.invalidate_cells(layer, cells)
+
+        self.bounds = list(new.bounds)
+        if new.spawn != -1:
+            self.spawn_pos = new.objects[new.spawn]["rect"][:2]
+
+        new_enemies = {object_key(new.objects[i]): new.objects[i] for i in new.enemy_objects}
+        removed = set(old_enemies) - set(new_enemies)
+        self.enemies = [enemy for enemy in self.enemies if getattr(enemy, "level_object", None) not in removed]
+        for key in removed:
+            if self.streamer is not None:
+                self.streamer.remove_object(old_enemies[key])
+
+        for key, obj in new_enemies.items():
+            if key in old_enemies:
+                continue
+            if self.streamer is not None:
+                for spawn in self.streamer.add_object(obj):
+                    self.spawn_object(spawn)
+            else:
+                self.spawn_object(obj)
+
+        # Rooms already cleared stay cleared, and a battle in progress is left alone
+        if not self.in_battle:
+            cleared = old_rooms - {room["key"] for room in self.battle_rooms}
+            self.battle_rooms = [room for room in self.build_battle_rooms(new) if room["key"] not in cleared]
+
+    def check_reload(self):
+        if not self.reloader.pending() and self.watcher.changed():
+            self.reloader.start(self.level_path)
+
+        if self.reloader.ready():
+            try:
+                patch = self.reloader.take()
+            except (OSError, ValueError, KeyError) as e:
+                # Most likely caught the file half saved, the next save triggers another reload
+                self.reload_error = f"{type(e).__name__}: {e}"
+                return
+
+            if patch.path != self.level_path:
+                return
+
+            start = time.perf_counter()
+            self.apply_reload(patch)
+            self.level_reload_time = time.perf_counter() - start
+            self.reload_error = None
+
+    def add_lights(self):
+        # The player first, only the first LightMap.shadow_lights lights cast shadows
+        self.lighting.add(self.player.rect.center, 96, (255, 230, 200), 0.6)
+        for slash in self.slashes:
+            self.lighting.add((slash.x, slash.y), 48, slash.color, 0.8)
+        for projectile in self.projectiles:
+            self.lighting.add(projectile.rect.center, 32, projectile.light_color, 0.8)
+        for enemy in self.enemies:
+            if enemy.enemy_type == "lazer orb":
+                self.lighting.add(enemy.rect.center, 40, (255, 60, 60), 0.8)
+        for coin in self.coins:
+            self.lighting.add(coin.rect.center, 16, (255, 220, 80), 0.5)
+
+    def get_tiles_near_object(self, pos, tile_radius):
+        tiles, l_ramps, r_ramps = self.tiles.query_near(pos, tile_radius)
+
         if self.in_battle:
             for exit in self.battle_rooms[self.current_battle_room]["exits"]:
-                tiles.append(self.tiles[exit[1]])
+                tiles.append(exit[0])
         
         return [tiles, l_ramps, r_ramps]
 
@@ -195,7 +430,7 @@ class GameManager:
         pass
 
     def play_game(self):
-        self.game.window.fill((127, 127, 127))
+        self.game.window.fill(self.sky_color)
         self.game.clock.tick(self.game.FPS)
 
         self.now = time.time()
@@ -215,6 +450,13 @@ class GameManager:
 
         cam_view = [self.cam.scroll[0], self.cam.scroll[1], self.cam.scroll[0]+self.win_surf.get_width(), self.cam.scroll[1]+self.win_surf.get_height()]
 
+        if self.hot_reload:
+            self.check_reload()
+
+        if self.streamer is not None:
+            for obj in self.streamer.update(cam_view):
+                self.spawn_object(obj)
+
         if self.game.joystick != None:
             axis = self.game.joystick.get_axis(0)
 
@@ -239,6 +481,10 @@ class GameManager:
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_F3:
                     self.debug = not self.debug
+                if event.key == pygame.K_F4:
+                    self.lighting_enabled = not self.lighting_enabled
+                if event.key == pygame.K_F5:
+                    self.hot_reload = not self.hot_reload
                 if event.key == pygame.K_a:
                     self.player.left = True
                 if event.key == pygame.K_d:
@@ -298,19 +544,23 @@ class GameManager:
 
 
         # Draw level
+        # Everything drawn here goes into the render queue and is drawn when it gets flushed below
+        self.culler.update(self.cam.scroll)
         for layer in self.render_layers:
+            surf = self.render_queue.target(layer)
             if layer == "player":
-                self.player.draw(self.win_surf, self.cam.scroll)
+                self.player.draw(surf, self.cam.scroll)
                 if self.debug:
-                    pygame.draw.rect(self.win_surf, (0, 255, 0), (self.player.rect.x-self.cam.scroll[0], self.player.rect.y-self.cam.scroll[1], self.player.rect.width, self.player.rect.height), 1)
+                    draw_shape(surf, pygame.draw.rect, (0, 255, 0), (self.player.rect.x-self.cam.scroll[0], self.player.rect.y-self.cam.scroll[1], self.player.rect.width, self.player.rect.height), 1)
                 if not self.player.attacking:
-                    self.player.weapon.draw(self.player.rect.center, -angle_deg, self.win_surf, self.cam.scroll)
+                    self.player.weapon.draw(self.player.rect.center, -angle_deg, surf, self.cam.scroll)
 
                 self.player.weapon.update()
 
                 for i, coin in sorted(enumerate(self.coins), reverse=True):
                     coin.update(self.get_tiles_near_object([coin.rect.x, coin.rect.y], 1)[0])
-                    coin.draw(self.win_surf, self.cam.scroll)
+                    if self.culler.visible(coin.rect, "coins"):
+                        coin.draw(surf, self.cam.scroll)
 
                     if self.player.rect.colliderect(coin.rect):
                         self.level_info.coins += 1
@@ -321,6 +571,9 @@ class GameManager:
                 #self.win_surf.blit(state, (self.player.rect.x-self.cam.scroll[0], self.player.rect.y - self.cam.scroll[1] - 15))
             elif layer == "enemies":
                 for i, enemy in sorted(enumerate(self.enemies), reverse=True):
+                    if self.streamer is not None and not enemy.battle_enemy and not self.streamer.is_active(enemy.rect):
+                        continue # Frozen until its chunk is near the camera again
+
                     if enemy.enemy_type not in ["drone"]:
                         rects = self.get_tiles_near_object([enemy.rect.x, enemy.rect.y], 4)
                         enemy_rects.append(rects)
@@ -328,13 +581,13 @@ class GameManager:
                     else:
                         enemy.update(self.player)
 
-                    #if ((enemy.rect.x+enemy.rect.width+1) > cam_view[0] and enemy.rect.x < cam_view[2]) and ((enemy.rect.y+enemy.rect.height+1) > cam_view[1] and enemy.rect.y < cam_view[3]):
-                    enemy.draw(self.win_surf, self.cam.scroll)
-                    if self.debug:
-                        pygame.draw.rect(self.win_surf, (255, 0, 0), (enemy.rect.x-self.cam.scroll[0], enemy.rect.y-self.cam.scroll[1], enemy.rect.width, enemy.rect.height), 1)
+                    if self.culler.visible(enemy.get_bounds(), "enemies"):
+                        enemy.draw(surf, self.cam.scroll)
+                        if self.debug:
+                            draw_shape(surf, pygame.draw.rect, (255, 0, 0), (enemy.rect.x-self.cam.scroll[0], enemy.rect.y-self.cam.scroll[1], enemy.rect.width, enemy.rect.height), 1)
 
-                        state = self.debug_font.render(enemy.state, False, (255, 255, 255))
-                        self.win_surf.blit(state, (enemy.rect.centerx-state.get_width()/2-self.cam.scroll[0], enemy.rect.y-state.get_height()*1.1-self.cam.scroll[1]))
+                            state = self.text_cache.render(enemy.state)
+                            surf.blit(state, (enemy.rect.centerx-state.get_width()/2-self.cam.scroll[0], enemy.rect.y-state.get_height()*1.1-self.cam.scroll[1]))
 
 
                     if not enemy.alive:
@@ -354,7 +607,9 @@ class GameManager:
 
             elif layer == "attacks":
                 for i, slash in sorted(enumerate(self.slashes), reverse=True):
-                    slash.draw(self.win_surf, self.cam.scroll)
+                    if self.culler.visible(slash.get_bounds(), "slashes"):
+                        slash.draw(surf, self.cam.scroll)
+                    slash.update() # Off screen slashes still play out
 
                     for enemy in self.enemies:
                         slash.handle_collision(enemy)
@@ -365,7 +620,8 @@ class GameManager:
                 for i, projectile in sorted(enumerate(self.projectiles), reverse=True):
                     projectile.update(self.get_tiles_near_object([projectile.rect.x, projectile.rect.y], 2)[0])
 
-                    projectile.draw(self.win_surf, self.cam.scroll)
+                    if self.culler.visible(projectile.rect, "projectiles"):
+                        projectile.draw(surf, self.cam.scroll)
 
                     if not projectile.active:
                         self.projectiles.pop(i)
@@ -383,51 +639,83 @@ class GameManager:
                                 break
                     
             else:
-                for tile_id in self.level[layer]:
-                    tile = self.level[layer][tile_id]
-                    pos = [tile[2][0]*TILESIZE, tile[2][1]*TILESIZE]
+                if layer == "background":
+                    self.background.draw(surf, self.cam.scroll)
+
+                if layer not in self.layer_overhang:
+                    continue
+
+                if self.layer_cache is not None:
+                    self.layer_cache.draw(surf, layer, self.cam.scroll)
+                else:
+                    overhang = self.layer_overhang[layer]
+                    x0 = int(cam_view[0]//TILESIZE)-overhang[0]
+                    y0 = int(cam_view[1]//TILESIZE)-overhang[1]
+                    x1 = int(cam_view[2]//TILESIZE)
+                    y1 = int(cam_view[3]//TILESIZE)
+
+                    source = self.streamer if self.streamer is not None else self.level
+                    draw_tiles(surf, self.tile_images, source.region(layer, x0, y0, x1, y1), self.cam.scroll)
 
-                    if tile[0] in ["tileset_green", "tileset_cherry"]:
-                        if (pos[0] > cam_view[0]-TILESIZE-1 and pos[0] < cam_view[2]+1) and (pos[1] > cam_view[1]-TILESIZE-1 and pos[1] < cam_view[3]+1):
-                            self.win_surf.blit(self.game.assets.get_tile(tile[0], tile[1]), (pos[0]-self.cam.scroll[0], pos[1]-self.cam.scroll[1]))
-                    else:
-                        img = self.game.assets.get_tile(tile[0], tile[1])
-                        if (pos[0] > cam_view[0]-img.get_width()-1 and pos[0] < cam_view[2]+1) and (pos[1] > cam_view[1]-img.get_height()-1 and pos[1] < cam_view[3]+1):
-                            self.win_surf.blit(img, (pos[0]-self.cam.scroll[0], pos[1]-self.cam.scroll[1]))
-                    
                 if self.debug:
                     for tile in collision_rects[0]:
-                        pygame.draw.rect(self.win_surf, (255, 255, 255), (tile.x-self.cam.scroll[0], tile.y-self.cam.scroll[1], tile.width, tile.height), 1)
+                        draw_shape(surf, pygame.draw.rect, (255, 255, 255), (tile.x-self.cam.scroll[0], tile.y-self.cam.scroll[1], tile.width, tile.height), 1)
                     for tile in collision_rects[1]:
-                        pygame.draw.rect(self.win_surf, (255, 255, 255), (tile.x-self.cam.scroll[0], tile.y-self.cam.scroll[1], tile.width, tile.height), 1)
+                        draw_shape(surf, pygame.draw.rect, (255, 255, 255), (tile.x-self.cam.scroll[0], tile.y-self.cam.scroll[1], tile.width, tile.height), 1)
                     for tile in collision_rects[2]:
-                        pygame.draw.rect(self.win_surf, (255, 255, 255), (tile.x-self.cam.scroll[0], tile.y-self.cam.scroll[1], tile.width, tile.height), 1)
+                        draw_shape(surf, pygame.draw.rect, (255, 255, 255), (tile.x-self.cam.scroll[0], tile.y-self.cam.scroll[1], tile.width, tile.height), 1)
 
                     for rects in enemy_rects:
                         for tile in rects[0]:
-                            pygame.draw.rect(self.win_surf, (255, 0, 0), (tile.x-self.cam.scroll[0], tile.y-self.cam.scroll[1], tile.width, tile.height), 1)
+                            draw_shape(surf, pygame.draw.rect, (255, 0, 0), (tile.x-self.cam.scroll[0], tile.y-self.cam.scroll[1], tile.width, tile.height), 1)
                         for tile in rects[1]:
-                            pygame.draw.rect(self.win_surf, (255, 0, 0), (tile.x-self.cam.scroll[0], tile.y-self.cam.scroll[1], tile.width, tile.height), 1)
+                            draw_shape(surf, pygame.draw.rect, (255, 0, 0), (tile.x-self.cam.scroll[0], tile.y-self.cam.scroll[1], tile.width, tile.height), 1)
                         for tile in rects[2]:
-                            pygame.draw.rect(self.win_surf, (255, 0, 0), (tile.x-self.cam.scroll[0], tile.y-self.cam.scroll[1], tile.width, tile.height), 1)
-        
-        text = self.debug_font.render(f"Coins: {self.level_info.coins}", False, (255, 255, 255))
+                            draw_shape(surf, pygame.draw.rect, (255, 0, 0), (tile.x-self.cam.scroll[0], tile.y-self.cam.scroll[1], tile.width, tile.height), 1)
+
+        self.render_queue.flush(self.win_surf)
+
+        if self.lighting_enabled:
+            self.add_lights()
+            self.lighting.draw(self.win_surf, self.cam.scroll, self.tiles)
+
+        text = self.text_cache.render(f"Coins: {self.level_info.coins}")
         self.win_surf.blit(text, (self.win_surf.get_width()-text.get_width()*1.2, 5))
 
-        text2 = self.debug_font.render(f"Health: {self.player.health}", False, (255, 255, 255))
+        text2 = self.text_cache.render(f"Health: {self.player.health}")
         self.win_surf.blit(text2, (5, 5))
 
-        text3 = self.debug_font.render(f"FPS: {int(self.game.clock.get_fps())}", False, (255, 255, 255))
+        text3 = self.text_cache.render(f"FPS: {int(self.game.clock.get_fps())}")
         self.win_surf.blit(text3, (5, 20))
 
         if self.debug:
             # debug test
-            pos_text = self.debug_font.render(f"Player pos-> x: {self.player.rect.x} y: {self.player.rect.y}", False, (255, 255, 255))
-            weapon_text = self.debug_font.render(f"Current weapon: {self.player.weapon.name}", False, (255, 255, 255))
+            pos_text = self.text_cache.render(f"Player pos-> x: {self.player.rect.x} y: {self.player.rect.y}")
+            weapon_text = self.text_cache.render(f"Current weapon: {self.player.weapon.name}")
+            reload = "failed" if self.reload_error else f"{self.level_reload_time*1000:.2f}ms"
+            swap_text = self.text_cache.render(f"Level swap: {self.level_swap_time*1000:.2f}ms load: {self.preloader.load_time*1000:.1f}ms reload: {reload} present: {self.game.window.present_time*1000:.2f}ms")
 
+            draws = sum(stat[0] for stat in self.render_queue.stats.values())
+            flush_time = sum(stat[1] for stat in self.render_queue.stats.values())
+            queue_text = self.text_cache.render(f"Draws: {draws} flush: {flush_time*1000:.2f}ms rotations: {E.rotation_cache.hit_rate()*100:.0f}% outlines: {E.outline_cache.misses} made")
+
+            frames, variants = self.game.assets.animation_memory()
+            memory_text = self.text_cache.render(f"Animation frames: {frames/1024:.0f}KB variants: {variants/1024:.0f}KB")
+
+            self.win_surf.blit(queue_text, (5, self.win_surf.get_height()-queue_text.get_height()-56))
+            drawn, culled = self.culler.totals()
+            cull_text = self.text_cache.render(f"Drawn: {drawn} culled: {culled} lights: {self.lighting.stats['lights']} ({self.lighting.stats['shadowed']} shadowed) {self.lighting.stats['time']*1000:.2f}ms")
+
+            self.win_surf.blit(memory_text, (5, self.win_surf.get_height()-memory_text.get_height()-74))
+            self.win_surf.blit(cull_text, (5, self.win_surf.get_height()-cull_text.get_height()-92))
+            self.win_surf.blit(swap_text, (5, self.win_surf.get_height()-swap_text.get_height()-38))
             self.win_surf.blit(pos_text, (5, self.win_surf.get_height()-pos_text.get_height()-20))
             self.win_surf.blit(weapon_text, (5, self.win_surf.get_height()-weapon_text.get_height()-2))
 
+            if self.reload_error:
+                error_text = self.text_cache.render(f"Reload failed: {self.reload_error}")
+                self.win_surf.blit(error_text, (5, self.win_surf.get_height()-error_text.get_height()-110))
+
         self.game.window.update()
     
     def run(self):
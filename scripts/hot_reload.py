@@ -0,0 +1,89 @@
+import os
+import time
+
+import numpy as np
+
+import scripts.level as L
+
+
+def object_key(obj):
+    # Identifies a level object across reloads, objects have no ids of their own
+    return (obj["name"], tuple(obj["rect"]), tuple(sorted(obj["properties"].items())))
+
+
+def remap_palette(palette, level):
+    # Renumbers level's grids and palette to match palette, appending entries palette doesn't have.
+    # Returns the refs that were appended.
+    refs = {entry: ref for ref, entry in enumerate(palette) if entry is not None}
+    merged = list(palette)
+    remap = np.zeros(len(level.palette), dtype=np.uint16)
+    added = []
+    for ref, entry in enumerate(level.palette):
+        if entry is None:
+            continue
+        new = refs.get(entry)
+        if new is None:
+            new = len(merged)
+            refs[entry] = new
+            merged.append(entry)
+            added.append(new)
+        remap[ref] = new
+
+    for layer in level.layers:
+        level.layers[layer] = remap[level.layers[layer]]
+    level.palette = merged
+    level.palette_flags = L.flag_table(merged)
+    return added
+
+
+def diff_layers(old, new):
+    # layer name -> [[x, y, ref], ...] of the cells that differ, both levels must share their palette.
+    # Returns None when the grids can't be patched in place.
+    if old.origin != new.origin or old.shape != new.shape or set(old.layers) != set(new.layers):
+        return None
+
+    cells = {}
+    for layer, grid in new.layers.items():
+        ys, xs = np.nonzero(grid != old.layers[layer])
+        if len(ys):
+            ox, oy = new.origin
+            cells[layer] = [[x+ox, y+oy, ref] for x, y, ref in zip(xs.tolist(), ys.tolist(), grid[ys, xs].tolist())]
+    return cells
+
+
+class ReloadPatch:
+    def __init__(self, path, level):
+        self.path = path
+        self.level = level # New level, numbered with the running level's palette
+        self.added_refs = []
+        self.tile_images = [] # Surfaces of added_refs
+        self.cells = None # layer -> changed cells, None if the whole level has to be swapped
+        self.tiles = None # Collision TileMap of the new level when cells is None
+
+
+class LevelWatcher:
+    # Polls the modification time of a level file, at most once every interval seconds
+    def __init__(self, path, interval=0.25):
+        self.path = path
+        self.interval = interval
+        self.last_check = 0
+        self.stamp = self.get_stamp()
+
+    def get_stamp(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def changed(self):
+        now = time.perf_counter()
+        if now - self.last_check < self.interval:
+            return False
+        self.last_check = now
+
+        stamp = self.get_stamp()
+        if stamp is None or stamp == self.stamp:
+            return False
+        self.stamp = stamp
+        return True
@@ -0,0 +1,600 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from scripts.autotile import AutoTiler
+
+# Compiled level format (.lvlc), little endian:
+#   header
+#   string table   -> every name/key/value used below is an index into it
+#   tileset table  -> string index per tileset
+#   tile palette   -> (tileset index, id kind, id) per entry, entry 0 means "no tile"
+#   layers         -> name index followed by a packed uint16 grid of palette refs
+#   objects        -> name, rect and properties of every level object
+#   palette flags  -> collision flags per palette entry
+#   object tables  -> spawn, enemy and battle room objects as indices into the object list
+#   auto tile rules -> string index of the level's auto_tile_rules as json
+MAGIC = b"SLVL"
+FORMAT_VERSION = 3
+COMPILED_EXT = ".lvlc"
+
+HEADER = struct.Struct("<4sHH20s10i")
+COUNT = struct.Struct("<I")
+STRING = struct.Struct("<H")
+PALETTE_ENTRY = struct.Struct("<HBi")
+OBJECT = struct.Struct("<I4iH")
+PROPERTY = struct.Struct("<II")
+ROOM = struct.Struct("<IIII") # object index, waves, exit count, enemy group count
+INDEX = struct.Struct("<i")
+
+ID_INT = 0
+ID_STR = 1
+
+# Collision flags stored per cell
+SOLID = 1
+R_RAMP = 2
+L_RAMP = 4
+RAMPS = R_RAMP | L_RAMP
+
+R_RAMP_TILE = 16
+L_RAMP_TILE = 17
+NON_SOLID_TILES = ["tree 1", "tree 2", R_RAMP_TILE, L_RAMP_TILE]
+
+ENEMY_OBJECTS = ["Dummy", "drone", "Roller", "Lazer Orb"]
+
+
+def tile_flags(tile_id):
+    if tile_id == R_RAMP_TILE:
+        return R_RAMP
+    if tile_id == L_RAMP_TILE:
+        return L_RAMP
+    if tile_id in NON_SOLID_TILES:
+        return 0
+    return SOLID
+
+
+def flag_table(palette):
+    table = np.zeros(len(palette), dtype=np.uint8)
+    for ref, entry in enumerate(palette):
+        if entry is not None:
+            table[ref] = tile_flags(entry[1])
+    return table
+
+
+def resolve_objects(objects):
+    # Finds the spawn, enemies and battle rooms of a level, with battle room exits and enemy ids
+    # resolved to object indices. Returns [spawn, enemies, battle_rooms], spawn is -1 if missing.
+    by_name = {}
+    for i, obj in enumerate(objects):
+        by_name.setdefault(obj["name"], []).append(i)
+
+    spawn = -1
+    enemies = []
+    battle_rooms = []
+    for i, obj in enumerate(objects):
+        if obj["name"] == "Spawn":
+            spawn = i
+
+        if obj["name"] in ENEMY_OBJECTS:
+            enemies.append(i)
+
+        if obj["name"] == "BattleRoom":
+            props = obj["properties"]
+            room = {"object": i, "waves": int(props.get("waves", 0)), "exits": [], "enemies": []}
+            for exit in props.get("exits", "").split(","):
+                room["exits"] += by_name.get(exit, [])
+
+            for waves in props.get("enemy_ids", "").split(";"):
+                group = []
+                for enemy_id in waves.split(","):
+                    group += by_name.get(enemy_id, [])
+                room["enemies"].append(group)
+            battle_rooms.append(room)
+
+    return [spawn, enemies, battle_rooms]
+
+
+def validate_level(level):
+    # Returns a list of problems that would break the level at runtime
+    errors = []
+    names = {obj["name"] for obj in level.objects}
+
+    if "Spawn" not in names:
+        errors.append("no Spawn object")
+
+    for obj in level.objects:
+        if obj["name"] != "BattleRoom":
+            continue
+        props = obj["properties"]
+        where = f"BattleRoom at {obj['rect'][0]}, {obj['rect'][1]}"
+
+        missing = [key for key in ["waves", "exits", "enemy_ids"] if key not in props]
+        if missing:
+            errors.append(f"{where} is missing {', '.join(missing)}")
+            continue
+
+        try:
+            waves = int(props["waves"])
+        except ValueError:
+            errors.append(f"{where} has a non integer wave count {props['waves']!r}")
+            continue
+        groups = props["enemy_ids"].split(";")
+        if waves < 1 or waves > len(groups):
+            errors.append(f"{where} has {waves} waves but {len(groups)} enemy groups")
+
+        for exit in props["exits"].split(","):
+            if exit not in names:
+                errors.append(f"{where} exit {exit!r} has no matching object")
+
+        for enemy_id in ",".join(groups).split(","):
+            if enemy_id not in names:
+                errors.append(f"{where} enemy id {enemy_id!r} has no matching object")
+                continue
+            for other in level.objects:
+                if other["name"] == enemy_id and "enemy" not in other["properties"]:
+                    errors.append(f"{where} enemy id {enemy_id!r} has an object without an enemy property")
+                    break
+
+    for layer, grid in level.layers.items():
+        if grid.size and int(grid.max()) >= len(level.palette):
+            errors.append(f"layer {layer!r} references tiles outside the palette")
+
+    return errors
+
+
+def grid_region(grid, origin, x0, y0, x1, y1):
+    # [refs, xs, ys] arrays of the tiles of the grid inside the inclusive tile region, row by row
+    gx0 = max(x0 - origin[0], 0)
+    gy0 = max(y0 - origin[1], 0)
+    gx1 = min(x1 - origin[0] + 1, grid.shape[1])
+    gy1 = min(y1 - origin[1] + 1, grid.shape[0])
+    if gx0 >= gx1 or gy0 >= gy1:
+        empty = np.zeros(0, dtype=np.intp)
+        return [empty, empty, empty]
+
+    window = grid[gy0:gy1, gx0:gx1]
+    ys, xs = np.nonzero(window)
+    return [window[ys, xs], xs+gx0+origin[0], ys+gy0+origin[1]]
+
+
+def grid_tiles_in_region(grid, origin, x0, y0, x1, y1):
+    # Iterates [ref, x, y] for every tile of the grid inside the inclusive tile region
+    refs, xs, ys = grid_region(grid, origin, x0, y0, x1, y1)
+    return zip(refs.tolist(), xs.tolist(), ys.tolist())
+
+
+class Level:
+    def __init__(self, name, origin, size, bounds, tilesets, palette, layers, objects, shape=None, palette_flags=None, tables=None):
+        self.name = name
+        self.origin = origin # Tile position of grid cell [0, 0]
+        self.size = size # Size of the level as saved by the level editor
+        self.bounds = bounds # [left, top, right, bottom] in tiles
+        self.tilesets = tilesets
+        self.palette = palette # palette[ref] -> (tileset, tile_id), palette[0] is None
+        self.layers = layers # layer name -> uint16 grid indexed [y, x]
+        self.objects = objects
+
+        if shape is None:
+            shape = (0, 0)
+            for grid in layers.values():
+                shape = grid.shape
+                break
+        self.shape = tuple(shape)
+
+        # Worked out when the level is compiled so loading it doesn't have to
+        if palette_flags is None:
+            palette_flags = flag_table(palette)
+        self.palette_flags = palette_flags # palette ref -> collision flags
+        if tables is None:
+            tables = resolve_objects(objects)
+        self.spawn, self.enemy_objects, self.battle_rooms = tables
+
+        # When streamed the grids are left in the compiled file and read a region at a time, see read_region
+        self.file = None
+        self.layer_offsets = {}
+
+        self.auto_tile_rules = {}
+
+    @property
+    def streamed(self):
+        return self.file is not None
+
+    @property
+    def layer_names(self):
+        if self.streamed:
+            return list(self.layer_offsets)
+        return list(self.layers)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    @property
+    def width(self):
+        return self.shape[1]
+
+    @property
+    def height(self):
+        return self.shape[0]
+
+    def get_tile(self, layer, x, y):
+        grid = self.layers[layer]
+        gx = x - self.origin[0]
+        gy = y - self.origin[1]
+        if 0 <= gx < grid.shape[1] and 0 <= gy < grid.shape[0]:
+            return self.palette[grid[gy, gx]]
+        return None
+
+    def iter_tiles(self, layer):
+        # Yields [tileset, tile_id, x, y] for every tile in the layer, in tile coordinates
+        grid = self.layers[layer]
+        ys, xs = np.nonzero(grid)
+        refs = grid[ys, xs].tolist()
+        ox, oy = self.origin
+        for ref, x, y in zip(refs, xs.tolist(), ys.tolist()):
+            tileset, tile_id = self.palette[ref]
+            yield tileset, tile_id, x+ox, y+oy
+
+    def tiles_in_region(self, layer, x0, y0, x1, y1):
+        return grid_tiles_in_region(self.layers[layer], self.origin, x0, y0, x1, y1)
+
+    def region(self, layer, x0, y0, x1, y1):
+        return grid_region(self.layers[layer], self.origin, x0, y0, x1, y1)
+
+    def read_region(self, layer, gx0, gy0, gx1, gy1):
+        # Copy of the grid cells [gy0:gy1, gx0:gx1], clipped to the grid
+        height, width = self.shape
+        gx0 = min(max(gx0, 0), width)
+        gx1 = min(max(gx1, gx0), width)
+        gy0 = min(max(gy0, 0), height)
+        gy1 = min(max(gy1, gy0), height)
+
+        if not self.streamed:
+            return np.array(self.layers[layer][gy0:gy1, gx0:gx1], dtype=np.uint16)
+
+        region = np.zeros((gy1-gy0, gx1-gx0), dtype="<u2")
+        if gx1 > gx0:
+            offset = self.layer_offsets[layer]
+            for row in range(gy0, gy1):
+                self.file.seek(offset + (row*width + gx0)*2)
+                self.file.readinto(region[row-gy0])
+        return region.astype(np.uint16, copy=False)
+
+    def autotiler(self):
+        tiler = AutoTiler(self.auto_tile_rules, self.palette, self.tilesets)
+        if len(self.palette) > len(self.palette_flags):
+            self.palette_flags = flag_table(self.palette)
+        return tiler
+
+    def layer_refs(self, layer):
+        return [ref for ref in np.unique(self.layers[layer]).tolist() if ref != 0]
+
+    def tile_count(self, layer):
+        return int(np.count_nonzero(self.layers[layer]))
+
+
+def compiled_path(path):
+    return os.path.splitext(path)[0] + COMPILED_EXT
+
+def level_name(path):
+    return os.path.basename(path).split(".")[0]
+
+def from_json(data, name=""):
+    layer_data = data["level"]
+
+    min_x = min_y = 0
+    max_x = max_y = -1
+    first = True
+    for layer in layer_data:
+        for tile in layer_data[layer].values():
+            x, y = tile[2]
+            if first:
+                min_x = max_x = x
+                min_y = max_y = y
+                first = False
+            else:
+                min_x = min(min_x, x)
+                max_x = max(max_x, x)
+                min_y = min(min_y, y)
+                max_y = max(max_y, y)
+
+    width = max_x - min_x + 1
+    height = max_y - min_y + 1
+
+    tilesets = []
+    palette = [None]
+    refs = {}
+    layers = {}
+    for layer in layer_data:
+        grid = np.zeros((height, width), dtype=np.uint16)
+        for tile in layer_data[layer].values():
+            key = (tile[0], tile[1])
+            ref = refs.get(key)
+            if ref is None:
+                if tile[0] not in tilesets:
+                    tilesets.append(tile[0])
+                ref = len(palette)
+                refs[key] = ref
+                palette.append(key)
+            grid[tile[2][1]-min_y, tile[2][0]-min_x] = ref
+        layers[layer] = grid
+
+    auto_tile_rules = data.get("auto_tile_rules", {})
+    if auto_tile_rules:
+        AutoTiler(auto_tile_rules, palette, tilesets).retile(layers)
+
+    bounds = [data["bounds"]["left"], data["bounds"]["top"], data["bounds"]["right"], data["bounds"]["bottom"]]
+    objects = [{"rect": list(obj["rect"]), "name": obj["name"], "properties": dict(obj["properties"])} for obj in data["objects"]]
+
+    level = Level(name, [min_x, min_y], list(data["size"]), bounds, tilesets, palette, layers, objects)
+    level.auto_tile_rules = auto_tile_rules
+    return level
+
+def parse_json(path):
+    with open(path) as file:
+        data = json.load(file)
+    return from_json(data, level_name(path))
+
+
+class _StringTable:
+    def __init__(self):
+        self.strings = []
+        self.index = {}
+
+    def add(self, string):
+        string = str(string)
+        if string not in self.index:
+            self.index[string] = len(self.strings)
+            self.strings.append(string)
+        return self.index[string]
+
+    def pack(self):
+        out = [COUNT.pack(len(self.strings))]
+        for string in self.strings:
+            encoded = string.encode("utf-8")
+            out.append(STRING.pack(len(encoded)))
+            out.append(encoded)
+        return b"".join(out)
+
+
+def _pad(chunks, length):
+    padding = -length % 4
+    if padding:
+        chunks.append(b"\x00"*padding)
+    return length + padding
+
+def compile_level(level, digest=b"\x00"*20):
+    strings = _StringTable()
+
+    tileset_index = {tileset: i for i, tileset in enumerate(level.tilesets)}
+    palette = []
+    for entry in level.palette[1:]:
+        tileset, tile_id = entry
+        if isinstance(tile_id, int):
+            palette.append(PALETTE_ENTRY.pack(tileset_index[tileset], ID_INT, tile_id))
+        else:
+            palette.append(PALETTE_ENTRY.pack(tileset_index[tileset], ID_STR, strings.add(tile_id)))
+
+    tilesets = [COUNT.pack(strings.add(tileset)) for tileset in level.tilesets]
+    layer_names = [strings.add(layer) for layer in level.layers]
+    rules = strings.add(json.dumps(level.auto_tile_rules))
+
+    objects = []
+    for obj in level.objects:
+        props = obj["properties"]
+        objects.append(OBJECT.pack(strings.add(obj["name"]), *obj["rect"], len(props)))
+        for key in props:
+            objects.append(PROPERTY.pack(strings.add(key), strings.add(props[key])))
+
+    height, width = level.shape
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, len(level.layers), digest, level.origin[0], level.origin[1], width, height, *level.bounds, *level.size)
+
+    chunks = [header, strings.pack()]
+    length = _pad(chunks, sum(len(c) for c in chunks))
+
+    body = [COUNT.pack(len(tilesets))] + tilesets + [COUNT.pack(len(palette))] + palette
+    chunks += body
+    length = _pad(chunks, length + sum(len(c) for c in body))
+
+    for name, grid in zip(layer_names, level.layers.values()):
+        chunks.append(COUNT.pack(name))
+        chunks.append(np.ascontiguousarray(grid, dtype="<u2").tobytes())
+        length = _pad(chunks, length + COUNT.size + grid.size*2)
+
+    chunks.append(COUNT.pack(len(level.objects)))
+    chunks += objects
+    length = _pad(chunks, length + COUNT.size + sum(len(c) for c in objects))
+
+    flags = np.ascontiguousarray(level.palette_flags, dtype=np.uint8).tobytes()
+    chunks += [COUNT.pack(len(flags)), flags]
+    _pad(chunks, length + COUNT.size + len(flags))
+
+    chunks.append(INDEX.pack(level.spawn))
+    chunks.append(_pack_indices(level.enemy_objects))
+    chunks.append(COUNT.pack(len(level.battle_rooms)))
+    for room in level.battle_rooms:
+        chunks.append(ROOM.pack(room["object"], room["waves"], len(room["exits"]), len(room["enemies"])))
+        chunks.append(_pack_indices(room["exits"]))
+        for group in room["enemies"]:
+            chunks.append(_pack_indices(group))
+    chunks.append(COUNT.pack(rules))
+
+    return b"".join(chunks)
+
+def _pack_indices(indices):
+    return COUNT.pack(len(indices)) + struct.pack(f"<{len(indices)}I", *indices)
+
+def _unpack_indices(view, offset):
+    (count,) = COUNT.unpack_from(view, offset)
+    offset += COUNT.size
+    return list(struct.unpack_from(f"<{count}I", view, offset)), offset + COUNT.size*count
+
+def write_compiled(level, path, digest=b"\x00"*20):
+    data = compile_level(level, digest)
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as file:
+        file.write(data)
+    os.replace(temp_path, path)
+
+def read_header(buffer):
+    if len(buffer) < HEADER.size:
+        return None
+    header = HEADER.unpack_from(buffer, 0)
+    if header[0] != MAGIC or header[1] != FORMAT_VERSION:
+        return None
+    return header
+
+def read_compiled(path, digest=None, name=None, stream=False):
+    # Returns None if the file is missing, damaged, from an older format or was built from a different source.
+    # With stream set the grids are not loaded, the file is kept open so Level.read_region can read
+    # parts of them on demand.
+    if name is None:
+        name = level_name(path)
+    try:
+        file = open(path, "rb")
+    except OSError:
+        return None
+
+    level = None
+    try:
+        if os.fstat(file.fileno()).st_size >= HEADER.size:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                view = memoryview(buffer)
+                try:
+                    level = _unpack(view, digest, name, stream)
+                except (struct.error, UnicodeDecodeError, ValueError, IndexError, TypeError):
+                    # Truncated or damaged, treated like a stale cache so it gets rebuilt. The traceback
+                    # is gone once this block ends, so no slice of the buffer outlives it.
+                    level = None
+                finally:
+                    view.release()
+    finally:
+        if level is not None and stream:
+            level.file = file
+        else:
+            file.close()
+    return level
+
+def _unpack(view, digest, name, stream):
+    header = read_header(view)
+    if header is None:
+        return None
+
+    layer_count = header[2]
+    if digest is not None and header[3] != digest:
+        return None
+    origin = [header[4], header[5]]
+    width, height = header[6], header[7]
+    bounds = list(header[8:12])
+    size = list(header[12:14])
+
+    offset = HEADER.size
+    (count,) = COUNT.unpack_from(view, offset)
+    offset += COUNT.size
+    strings = []
+    for i in range(count):
+        (length,) = STRING.unpack_from(view, offset)
+        offset += STRING.size
+        strings.append(str(view[offset:offset+length], "utf-8"))
+        offset += length
+    offset += -offset % 4
+
+    (count,) = COUNT.unpack_from(view, offset)
+    offset += COUNT.size
+    tilesets = [strings[i] for i in struct.unpack_from(f"<{count}I", view, offset)]
+    offset += COUNT.size*count
+
+    (count,) = COUNT.unpack_from(view, offset)
+    offset += COUNT.size
+    palette = [None]
+    for tileset, kind, value in PALETTE_ENTRY.iter_unpack(view[offset:offset+PALETTE_ENTRY.size*count]):
+        palette.append((tilesets[tileset], value if kind == ID_INT else strings[value]))
+    offset += PALETTE_ENTRY.size*count
+    offset += -offset % 4
+
+    layers = {}
+    layer_offsets = {}
+    for i in range(layer_count):
+        (layer,) = COUNT.unpack_from(view, offset)
+        offset += COUNT.size
+        if stream:
+            layer_offsets[strings[layer]] = offset
+        else:
+            grid = np.frombuffer(view, dtype="<u2", count=width*height, offset=offset)
+            layers[strings[layer]] = grid.reshape(height, width).astype(np.uint16)
+        offset += width*height*2
+        offset += -offset % 4
+
+    (count,) = COUNT.unpack_from(view, offset)
+    offset += COUNT.size
+    objects = []
+    for i in range(count):
+        obj_name, x, y, w, h, prop_count = OBJECT.unpack_from(view, offset)
+        offset += OBJECT.size
+        props = {}
+        for j in range(prop_count):
+            key, value = PROPERTY.unpack_from(view, offset)
+            offset += PROPERTY.size
+            props[strings[key]] = strings[value]
+        objects.append({"rect": [x, y, w, h], "name": strings[obj_name], "properties": props})
+    offset += -offset % 4
+
+    (count,) = COUNT.unpack_from(view, offset)
+    offset += COUNT.size
+    palette_flags = np.frombuffer(view, dtype=np.uint8, count=count, offset=offset).copy()
+    offset += count
+    offset += -offset % 4
+
+    (spawn,) = INDEX.unpack_from(view, offset)
+    offset += INDEX.size
+    enemies, offset = _unpack_indices(view, offset)
+
+    (count,) = COUNT.unpack_from(view, offset)
+    offset += COUNT.size
+    battle_rooms = []
+    for i in range(count):
+        obj, waves, exit_count, group_count = ROOM.unpack_from(view, offset)
+        offset += ROOM.size
+        room = {"object": obj, "waves": waves, "exits": [], "enemies": []}
+        room["exits"], offset = _unpack_indices(view, offset)
+        for j in range(group_count):
+            group, offset = _unpack_indices(view, offset)
+            room["enemies"].append(group)
+        battle_rooms.append(room)
+
+    (rules,) = COUNT.unpack_from(view, offset)
+
+    level = Level(name, origin, size, bounds, tilesets, palette, layers, objects, (height, width), palette_flags, [spawn, enemies, battle_rooms])
+    level.layer_offsets = layer_offsets
+    level.auto_tile_rules = json.loads(strings[rules])
+    return level
+
+def source_digest(source):
+    return hashlib.sha1(source).digest()
+
+def load_level(path, use_cache=True, stream=False):
+    # Loads the compiled copy of a level, rebuilding it when the source .lvl has changed
+    with open(path, "rb") as file:
+        source = file.read()
+    digest = source_digest(source)
+    cache = compiled_path(path)
+
+    if use_cache:
+        level = read_compiled(cache, digest, level_name(path), stream)
+        if level is not None:
+            return level
+
+    level = from_json(json.loads(source), level_name(path))
+    if use_cache:
+        try:
+            write_compiled(level, cache, digest)
+        except OSError:
+            return level
+        if stream:
+            return read_compiled(cache, digest, level_name(path), stream) or level
+    return level
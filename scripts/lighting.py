@@ -0,0 +1,203 @@
+import time
+
+import numpy as np
+import pygame
+
+TILESIZE = 16
+
+
+def fft_size(n):
+    # Smallest size >= n with no prime factor over 5, numpy's FFTs are quickest on those
+    while True:
+        m = n
+        for p in (2, 3, 5):
+            while m % p == 0:
+                m //= p
+        if m == 1:
+            return n
+        n += 1
+
+
+def upsample(a, axis):
+    # Doubles the resolution of a along axis by linear interpolation, dropping the first and last entries
+    # which are only there as neighbours
+    a = np.moveaxis(a, axis, 0)
+    middle = a[1:-1]*0.75
+    out = np.empty((middle.shape[0]*2,) + middle.shape[1:])
+    out[0::2] = middle + a[:-2]*0.25
+    out[1::2] = middle + a[2:]*0.25
+    return np.moveaxis(out, 0, axis)
+
+
+class LightMap:
+    # Lights the view with a low resolution light map built in numpy, then scales it up and multiplies it
+    # onto the display in one blit.
+    # The first shadow_lights lights of a frame are shadowed by the solid tiles. The others are grouped by
+    # radius, a small group is stamped light by light while a big one is splatted into a grid and convolved
+    # with its falloff through an FFT, which costs the same for 30 lights or 3000. Lights past max_lights
+    # are dropped.
+    def __init__(self, size, scale=4, ambient=(170, 170, 190), max_lights=1024, shadow_lights=16, max_radius=128, radius_step=8, fft_lights=24, shadow_steps=8):
+        self.size = size
+        self.scale = scale # Display pixels per light map cell
+        self.map_size = (size[0]//scale, size[1]//scale)
+        self.ambient = np.array(ambient, dtype=np.float32)
+        self.max_lights = max_lights
+        self.shadow_lights = shadow_lights
+        self.max_radius = max_radius # Bigger lights get clamped to it
+        self.radius_step = radius_step # Unshadowed radii are rounded to it so they share groups
+        self.fft_lights = fft_lights # Groups at least this big get convolved
+        self.shadow_steps = shadow_steps # Most samples a shadow ray takes
+
+        self.lights = [] # [x, y, radius, color] in world pixels, cleared by draw()
+        self.dropped = 0
+        self.light_map = np.zeros((self.map_size[0], self.map_size[1], 3), dtype=np.float32) # Indexed [x, y] like surfarray
+        self.stamps = {} # radius in cells -> falloff
+
+        # Convolved lights are worked out at half the map's resolution, on a grid padded by the biggest
+        # radius so nothing wraps around
+        self.fft_scale = scale*2
+        self.pad = max_radius//self.fft_scale
+        self.coarse_size = (-(-self.map_size[0]//2), -(-self.map_size[1]//2))
+        self.padded_size = (fft_size(self.coarse_size[0] + self.pad*2), fft_size(self.coarse_size[1] + self.pad*2))
+        self.kernels = {} # radius in cells -> rfft2 of the falloff
+
+        self.small = pygame.Surface(self.map_size).convert()
+        self.surface = pygame.Surface(self.size).convert()
+
+        self.stats = {"lights": 0, "shadowed": 0, "convolved": 0, "dropped": 0, "time": 0}
+
+    def add(self, pos, radius, color=(255, 255, 255), intensity=1.0):
+        if len(self.lights) >= self.max_lights:
+            self.dropped += 1
+            return
+        self.lights.append([pos[0], pos[1], min(radius, self.max_radius), np.array(color[:3], dtype=np.float32)*intensity])
+
+    def get_stamp(self, cells):
+        if cells not in self.stamps:
+            offsets = np.arange(-cells, cells+1)
+            distance = np.hypot(offsets[:, None], offsets[None, :])/(cells+0.5)
+            self.stamps[cells] = (np.clip(1-distance, 0, 1)**2).astype(np.float32)
+        return self.stamps[cells]
+
+    def get_kernel(self, cells):
+        if cells not in self.kernels:
+            offsets = np.arange(-cells, cells+1)
+            kernel = np.zeros(self.padded_size)
+            kernel[np.ix_(offsets % self.padded_size[0], offsets % self.padded_size[1])] = self.get_stamp(cells)
+            self.kernels[cells] = np.fft.rfft2(kernel)
+        return self.kernels[cells]
+
+    def stamp(self, x, y, cells, color, scroll, mask=None):
+        # Adds one light's falloff, optionally times mask(x0, y0, x1, y1) -> [x, y] weights. False if it's off the map
+        scale = self.scale
+        cx = int((x-scroll[0])//scale)
+        cy = int((y-scroll[1])//scale)
+        x0 = max(cx-cells, 0)
+        y0 = max(cy-cells, 0)
+        x1 = min(cx+cells+1, self.map_size[0])
+        y1 = min(cy+cells+1, self.map_size[1])
+        if x0 >= x1 or y0 >= y1:
+            return False
+
+        falloff = self.get_stamp(cells)[x0-cx+cells:x1-cx+cells, y0-cy+cells:y1-cy+cells]
+        if mask is not None:
+            falloff = falloff*mask(x0, y0, x1, y1)
+        self.light_map[x0:x1, y0:y1] += falloff[:, :, None]*color
+        return True
+
+    def convolve(self, groups, scroll):
+        # groups is cells -> lights, every group costs one FFT however many lights it has
+        scale = self.fft_scale
+        pad = self.pad
+        spectrum = None
+        for cells, lights in groups.items():
+            cells = max(1, cells*self.scale//scale)
+            xs = (np.array([light[0] for light in lights])-scroll[0])//scale + pad
+            ys = (np.array([light[1] for light in lights])-scroll[1])//scale + pad
+            # Lights further out than the padding can't reach the view
+            keep = (xs >= 0) & (ys >= 0) & (xs < self.padded_size[0]) & (ys < self.padded_size[1])
+            colors = np.array([light[3] for light in lights])
+
+            sources = np.zeros((3, self.padded_size[0], self.padded_size[1]))
+            for channel in range(3):
+                np.add.at(sources[channel], (xs[keep].astype(np.int32), ys[keep].astype(np.int32)), colors[keep, channel])
+            part = np.fft.rfft2(sources)*self.get_kernel(cells)
+            spectrum = part if spectrum is None else spectrum + part
+
+        lit = np.fft.irfft2(spectrum, s=self.padded_size)[:, pad-1:pad+self.coarse_size[0]+1, pad-1:pad+self.coarse_size[1]+1]
+        lit = upsample(upsample(np.maximum(lit, 0), 1), 2)
+        self.light_map += lit[:, :self.map_size[0], :self.map_size[1]].transpose(1, 2, 0)
+
+    def visible_tiles(self, light_x, light_y, tx0, ty0, tx1, ty1, solid, solid_x0, solid_y0):
+        # [x, y] bools of the tiles tx0..tx1, ty0..ty1 the light reaches. Rays go from the light to the tile
+        # centres, the light's own tile and the tile at the end of the ray never block
+        tiles_x = np.arange(tx0, tx1+1)
+        tiles_y = np.arange(ty0, ty1+1)
+        steps = min(self.shadow_steps, max(2, len(tiles_x), len(tiles_y)))
+        t = (np.arange(1, steps)/steps)[:, None, None]
+        xs = np.floor((light_x + t*((tiles_x[:, None]+0.5)*TILESIZE - light_x))/TILESIZE).astype(np.int32)
+        ys = np.floor((light_y + t*((tiles_y[None, :]+0.5)*TILESIZE - light_y))/TILESIZE).astype(np.int32)
+        xs, ys = np.broadcast_arrays(xs, ys)
+
+        gx = xs - solid_x0
+        gy = ys - solid_y0
+        inside = (gx >= 0) & (gy >= 0) & (gx < solid.shape[1]) & (gy < solid.shape[0])
+        blocked = solid[np.clip(gy, 0, solid.shape[0]-1), np.clip(gx, 0, solid.shape[1]-1)] & inside
+        blocked &= ~((xs == int(light_x//TILESIZE)) & (ys == int(light_y//TILESIZE)))
+        blocked &= ~((xs == tiles_x[:, None]) & (ys == tiles_y[None, :]))
+        return ~blocked.any(axis=0)
+
+    def build(self, scroll, tiles=None):
+        self.light_map[:] = self.ambient
+        scale = self.scale
+
+        shadowed = self.lights[:self.shadow_lights] if tiles is not None else []
+        shadow_count = 0
+        if shadowed:
+            solid_x0 = int((scroll[0]-self.max_radius)//TILESIZE)
+            solid_y0 = int((scroll[1]-self.max_radius)//TILESIZE)
+            solid_x1 = int((scroll[0]+self.size[0]+self.max_radius)//TILESIZE)
+            solid_y1 = int((scroll[1]+self.size[1]+self.max_radius)//TILESIZE)
+            solid = tiles.solid_region(solid_x0, solid_y0, solid_x1, solid_y1)
+
+        for x, y, radius, color in shadowed:
+            def mask(x0, y0, x1, y1):
+                # Shadows are worked out per tile and then spread over the tile's cells
+                cell_tiles_x = ((scroll[0] + (np.arange(x0, x1)+0.5)*scale)//TILESIZE).astype(np.int32)
+                cell_tiles_y = ((scroll[1] + (np.arange(y0, y1)+0.5)*scale)//TILESIZE).astype(np.int32)
+                visible = self.visible_tiles(x, y, cell_tiles_x[0], cell_tiles_y[0], cell_tiles_x[-1], cell_tiles_y[-1], solid, solid_x0, solid_y0)
+                return visible[np.ix_(cell_tiles_x-cell_tiles_x[0], cell_tiles_y-cell_tiles_y[0])]
+            shadow_count += self.stamp(x, y, max(1, int(radius//scale)), color, scroll, mask)
+
+        groups = {}
+        for light in self.lights[len(shadowed):]:
+            radius = max(self.radius_step, round(light[2]/self.radius_step)*self.radius_step)
+            groups.setdefault(int(radius//scale), []).append(light)
+
+        convolved = {}
+        for cells, lights in groups.items():
+            if len(lights) >= self.fft_lights:
+                convolved[cells] = lights
+            else:
+                for x, y, radius, color in lights:
+                    self.stamp(x, y, cells, color, scroll)
+        if convolved:
+            self.convolve(convolved, scroll)
+
+        np.minimum(self.light_map, 255, out=self.light_map)
+        self.stats["lights"] = len(self.lights)
+        self.stats["shadowed"] = shadow_count
+        self.stats["convolved"] = sum(len(lights) for lights in convolved.values())
+
+    def draw(self, surf, scroll, tiles=None):
+        # Lights surf with everything add()ed since the last draw
+        start = time.perf_counter()
+        self.build(scroll, tiles)
+        pygame.surfarray.blit_array(self.small, self.light_map.astype(np.uint8))
+        pygame.transform.smoothscale(self.small, self.size, self.surface)
+        surf.blit(self.surface, (0, 0), special_flags=pygame.BLEND_RGB_MULT)
+
+        self.stats["dropped"] = self.dropped
+        self.stats["time"] = time.perf_counter() - start
+        self.lights = []
+        self.dropped = 0
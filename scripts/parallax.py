@@ -0,0 +1,47 @@
+import math
+import pygame
+
+COLORKEY = (0, 0, 0)
+
+
+class ParallaxLayer:
+    def __init__(self, image, factor, factor_y=0):
+        self.image = image
+        self.factor = factor # 0 stays put, 1 moves with the level
+        self.factor_y = factor_y
+        self.strip = None
+
+    def build_strip(self, view_width):
+        # The image repeated until any window of view_width into the first image's width is covered,
+        # so a wrapped layer is always one blit
+        width = self.image.get_width()
+        copies = math.ceil(view_width/width) + 1
+        self.strip = pygame.Surface((width*copies, self.image.get_height())).convert()
+        self.strip.fill(COLORKEY)
+        self.strip.fblits([(self.image, (i*width, 0)) for i in range(copies)])
+        self.strip.set_colorkey(COLORKEY, pygame.RLEACCEL)
+
+    def get_offset(self, scroll, view_height):
+        x = int(scroll[0]*self.factor) % self.image.get_width()
+        # Vertically the image never leaves a gap at the top or bottom of the view
+        y = -int(scroll[1]*self.factor_y)
+        y = min(0, max(view_height-self.image.get_height(), y))
+        return (x, y)
+
+
+class ParallaxBackground:
+    # Layers draw back to front, each one as a single area blit out of its strip, so a frame costs one
+    # blit per layer whether the camera moves or not
+    def __init__(self, size, layers):
+        self.size = size
+        self.layers = layers
+        for layer in self.layers:
+            layer.build_strip(self.size[0])
+
+        self.blits = 0 # Blits the last draw() did
+
+    def draw(self, surf, scroll):
+        for layer in self.layers:
+            offset = layer.get_offset(scroll, self.size[1])
+            surf.blit(layer.strip, (0, offset[1]), (offset[0], 0, self.size[0], layer.strip.get_height()))
+        self.blits = len(self.layers)
@@ -38,7 +38,7 @@ class Scarf:
 
             pygame.draw.line(self.surface, self.color, (self.scarf[index-1]-self.scarf[0])+offset_vec, (self.scarf[index]-self.scarf[0])+offset_vec, 3)
         
-        E.perfect_outline(self.surface, surf, (self.scarf[0].x-30-scroll[0], self.scarf[0].y-30-scroll[1]), self.outline_color)
+        E.perfect_outline(self.surface, surf, (self.scarf[0].x-30-scroll[0], self.scarf[0].y-30-scroll[1]), self.outline_color, cache=False)
         surf.blit(self.surface, (self.scarf[0].x-30-scroll[0], self.scarf[0].y-30-scroll[1])) 
     
     def wind(self, index, t, amplitude):
@@ -176,7 +176,7 @@ class Player(HurtableEntity):
         if self.can_throw:
             surf = pygame.Surface((8,8))
             surf.fill((0, 0, 255))
-            p = Projectile(surf, self, 2, self.rect.centerx, self.rect.centery, 8, 8, 8, angle)
+            p = Projectile(surf, self, 2, self.rect.centerx, self.rect.centery, 8, 8, 8, angle, (60, 60, 255))
 
             projectile_list.append(p)
             self.throw_timer.set()
@@ -502,12 +502,14 @@ class Player(HurtableEntity):
         
         self.scarf.draw(surf, scroll)
         if not self.leaping:
-            E.perfect_outline(pygame.transform.flip(self.image, self.flip, False), surf, (self.rect.x+offset_x-scroll[0],self.rect.y-scroll[1]-3), (20, 20, 20))
-            surf.blit(pygame.transform.flip(self.image, self.flip, False), (self.rect.x+offset_x-scroll[0],self.rect.y-scroll[1]-3))
+            image = self.animation.variant(self.image, self.flip)
+            E.perfect_outline(image, surf, (self.rect.x+offset_x-scroll[0],self.rect.y-scroll[1]-3), (20, 20, 20))
+            surf.blit(image, (self.rect.x+offset_x-scroll[0],self.rect.y-scroll[1]-3))
 
         else:
-            E.perfect_outline(pygame.transform.rotate(pygame.transform.flip(self.image, self.flip, False), self.leap_angle), surf, (self.rect.x+offset_x-scroll[0],self.rect.y-scroll[1]-3), (20, 20, 20))
-            surf.blit(pygame.transform.rotate(pygame.transform.flip(self.image, self.flip, False), self.leap_angle), (self.rect.x+offset_x-scroll[0],self.rect.y-scroll[1]-3))
+            image = E.rotation_cache.rotate(self.animation.variant(self.image, self.flip), self.leap_angle)
+            E.perfect_outline(image, surf, (self.rect.x+offset_x-scroll[0],self.rect.y-scroll[1]-3), (20, 20, 20))
+            surf.blit(image, (self.rect.x+offset_x-scroll[0],self.rect.y-scroll[1]-3))
 
     def update(self, tiles, l_ramps, r_ramps):
         super().update()
@@ -0,0 +1,44 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class LevelPreloader:
+    # Runs a level's prepare step on a worker thread while the current level keeps playing
+    def __init__(self, prepare):
+        self.prepare = prepare
+        self.executor = None
+        self.future = None
+        self.path = None
+        self.load_time = 0 # Seconds the worker spent on the last level
+
+    def start(self, path):
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="level_preload")
+        self.path = path
+        self.future = self.executor.submit(self._run, path)
+
+    def _run(self, path):
+        start = time.perf_counter()
+        prepared = self.prepare(path)
+        self.load_time = time.perf_counter() - start
+        return prepared
+
+    def pending(self):
+        return self.future is not None
+
+    def ready(self):
+        return self.future is not None and self.future.done()
+
+    def take(self):
+        # Blocks until the level is prepared, errors from the worker are raised here
+        if self.future is None:
+            raise RuntimeError("No level is being preloaded")
+        future = self.future
+        self.future = None
+        return future.result()
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+        self.future = None
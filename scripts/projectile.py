@@ -1,10 +1,11 @@
 import pygame
 import math
-from scripts.Engine import Physics, blit_center
+from scripts.Engine import Physics, blit_center, rotation_cache
 
 class PhysicsProjectile:
-    def __init__(self, image, owner, damage, x, y, width, height, grav, vel):
+    def __init__(self, image, owner, damage, x, y, width, height, grav, vel, light_color=(255, 255, 255)):
         self.image = image
+        self.light_color = light_color
         self.owner = owner
         self.dmg = damage
         self.x = x
@@ -46,8 +47,9 @@ class PhysicsProjectile:
         self.movement[1] += self.gravity
 
 class Projectile:
-    def __init__(self, image, owner, damage, x, y, width, height, speed, angle):
+    def __init__(self, image, owner, damage, x, y, width, height, speed, angle, light_color=(255, 255, 255)):
         self.image = image
+        self.light_color = light_color
         self.owner = owner
         self.dmg = damage
         self.x = x
@@ -62,7 +64,7 @@ class Projectile:
         self.active = True
 
     def draw(self, surf, scroll):
-        blit_center(surf, pygame.transform.rotate(self.image, -math.degrees(self.angle)), (self.rect.x-scroll[0], self.rect.y-scroll[1]))
+        blit_center(surf, rotation_cache.rotate(self.image, -math.degrees(self.angle)), (self.rect.x-scroll[0], self.rect.y-scroll[1]))
     
     def update(self, tiles):
         collisions = self.physics_obj.movement(self.movement, tiles, 1.0)
@@ -0,0 +1,88 @@
+import pygame
+from collections import OrderedDict
+
+TILESIZE = 16
+CHUNK_TILES = 16 # 256x256 px
+COLORKEY = (0, 0, 0)
+
+
+def draw_tiles(surf, tile_images, tiles, offset):
+    # tiles is [refs, xs, ys] from Level.region, all of them go out in one fblits call
+    refs, xs, ys = tiles
+    dests = zip((xs*TILESIZE - offset[0]).tolist(), (ys*TILESIZE - offset[1]).tolist())
+    surf.fblits(list(zip([tile_images[ref] for ref in refs.tolist()], dests)))
+
+
+class LayerCache:
+    # Bakes the static layers into chunk surfaces so a frame only blits the few chunks the camera sees.
+    # Chunks are aligned to the world grid, each one draws every tile whose sprite reaches into it so
+    # sprites bigger than a tile (trees) come out the same as when drawn tile by tile.
+    def __init__(self, source, tile_images, layer_overhang, chunk_tiles=CHUNK_TILES, capacity=128):
+        self.source = source # Anything with region, a Level or LevelStreamer
+        self.tile_images = tile_images
+        self.layer_overhang = layer_overhang
+        self.chunk_tiles = chunk_tiles
+        self.chunk_size = chunk_tiles*TILESIZE
+        self.capacity = capacity # Baked chunks kept before the least recently used get dropped
+
+        self.chunks = OrderedDict() # (layer, cx, cy) -> Surface or None when the chunk is empty
+        self.bakes = 0
+
+    def bake(self, layer, cx, cy):
+        size = self.chunk_tiles
+        overhang = self.layer_overhang.get(layer, [0, 0])
+        x0 = cx*size
+        y0 = cy*size
+
+        self.bakes += 1
+        tiles = self.source.region(layer, x0-overhang[0], y0-overhang[1], x0+size-1, y0+size-1)
+        if not len(tiles[0]):
+            return None
+
+        surf = pygame.Surface((self.chunk_size, self.chunk_size)).convert()
+        surf.fill(COLORKEY)
+        surf.set_colorkey(COLORKEY)
+        draw_tiles(surf, self.tile_images, tiles, (x0*TILESIZE, y0*TILESIZE))
+        surf.set_colorkey(COLORKEY, pygame.RLEACCEL) # Only after drawing, RLE surfaces are slow to draw on
+        return surf
+
+    def get_chunk(self, layer, cx, cy):
+        key = (layer, cx, cy)
+        if key in self.chunks:
+            self.chunks.move_to_end(key)
+            return self.chunks[key]
+
+        surf = self.bake(layer, cx, cy)
+        self.chunks[key] = surf
+        while len(self.chunks) > self.capacity:
+            self.chunks.popitem(last=False)
+        return surf
+
+    def draw(self, surf, layer, scroll):
+        size = self.chunk_size
+        cx0 = int(scroll[0]//size)
+        cy0 = int(scroll[1]//size)
+        cx1 = int((scroll[0]+surf.get_width()-1)//size)
+        cy1 = int((scroll[1]+surf.get_height()-1)//size)
+
+        blits = []
+        for cy in range(cy0, cy1+1):
+            for cx in range(cx0, cx1+1):
+                chunk = self.get_chunk(layer, cx, cy)
+                if chunk is not None:
+                    blits.append((chunk, (cx*size-scroll[0], cy*size-scroll[1])))
+        surf.fblits(blits)
+
+    def invalidate_cells(self, layer, cells):
+        # cells is [[x, y, ...], ...] in tiles. A sprite reaches overhang tiles right and down of its cell,
+        # so the chunks those cover get baked again too.
+        overhang = self.layer_overhang.get(layer, [0, 0])
+        size = self.chunk_tiles
+        for cell in cells:
+            x, y = cell[0], cell[1]
+            for cy in range(y//size, (y+overhang[1])//size+1):
+                for cx in range(x//size, (x+overhang[0])//size+1):
+                    self.chunks.pop((layer, cx, cy), None)
+
+    def clear(self):
+        self.chunks.clear()
@@ -0,0 +1,122 @@
+import time
+
+
+class RenderTarget:
+    # Stands in for a Surface while a layer is being built, so draw code written against
+    # surf.blit keeps working. Everything drawn to it becomes a command in the queue.
+    def __init__(self, queue, layer, z=0):
+        self.queue = queue
+        self.layer = layer
+        self.z = z
+
+    def blit(self, source, dest, area=None, special_flags=0):
+        self.queue.submit(self.layer, self.z, source, dest, area, special_flags)
+
+    def blits(self, blit_sequence, doreturn=False):
+        for blit in blit_sequence:
+            self.queue.submit(self.layer, self.z, *blit)
+
+    def fblits(self, blit_sequence, special_flags=0):
+        # The whole sequence stays one command and goes out in one fblits call
+        self.queue.submit_sequence(self.layer, self.z, list(blit_sequence), special_flags)
+
+    def draw(self, func, *args):
+        # For pygame.draw and anything else that needs the real surface, func(surf, *args) runs at flush
+        self.queue.submit_call(self.layer, self.z, func, args)
+
+    def get_size(self):
+        return self.queue.size
+
+    def get_width(self):
+        return self.queue.size[0]
+
+    def get_height(self):
+        return self.queue.size[1]
+
+
+def draw_shape(surf, func, *args):
+    # pygame.draw on a Surface or a RenderTarget
+    if isinstance(surf, RenderTarget):
+        surf.draw(func, *args)
+    else:
+        func(surf, *args)
+
+
+class RenderQueue:
+    # Collects a frame's draw commands per layer and draws them in one go at the end of the frame.
+    # A layer's commands are drawn by z, then in the order they came in. Runs of plain blits and
+    # fblits sequences go out in a single Surface.fblits call, runs of blits with an area or flags in
+    # a single Surface.blits call.
+    def __init__(self, layers, size):
+        self.layers = list(layers) # Draw order
+        self.size = size
+        self.commands = {layer: [] for layer in self.layers}
+        self.targets = {}
+        self.count = 0
+
+        self.stats = {layer: [0, 0] for layer in self.layers} # layer -> [commands, flush seconds] of the last frame
+
+    def target(self, layer, z=0):
+        key = (layer, z)
+        if key not in self.targets:
+            self.targets[key] = RenderTarget(self, layer, z)
+        return self.targets[key]
+
+    def submit(self, layer, z, surface, dest, area=None, flags=0):
+        self.commands[layer].append((z, self.count, "blit", surface, dest, area, flags))
+        self.count += 1
+
+    def submit_sequence(self, layer, z, blit_sequence, flags=0):
+        # blit_sequence is [(surface, dest), ...] like Surface.fblits takes
+        self.commands[layer].append((z, self.count, "sequence", blit_sequence, None, None, flags))
+        self.count += 1
+
+    def submit_call(self, layer, z, func, args):
+        self.commands[layer].append((z, self.count, "call", func, args, None, 0))
+        self.count += 1
+
+    def send(self, surf, fast, slow):
+        # Draws and empties the pending batches, only one of them is ever filled at a time
+        if fast:
+            surf.fblits(fast)
+            fast.clear()
+        if slow:
+            surf.blits(slow, False)
+            slow.clear()
+
+    def flush_layer(self, surf, layer):
+        commands = self.commands[layer]
+        commands.sort(key=lambda command: (command[0], command[1]))
+
+        fast = [] # Plain blits, merged into one fblits call
+        slow = [] # Blits with an area or flags, go through blits
+        for z, i, kind, source, dest, area, flags in commands:
+            if kind == "blit" and area is None and not flags:
+                if slow:
+                    self.send(surf, fast, slow)
+                fast.append((source, dest))
+            elif kind == "blit":
+                if fast:
+                    self.send(surf, fast, slow)
+                slow.append((source, dest, area, flags))
+            elif kind == "sequence" and not flags:
+                if slow:
+                    self.send(surf, fast, slow)
+                fast.extend(source)
+            else:
+                self.send(surf, fast, slow)
+                if kind == "sequence":
+                    surf.fblits(source, flags)
+                else:
+                    source(surf, *dest)
+        self.send(surf, fast, slow)
+
+        commands.clear()
+
+    def flush(self, surf):
+        for layer in self.layers:
+            start = time.perf_counter()
+            count = len(self.commands[layer])
+            self.flush_layer(surf, layer)
+            self.stats[layer] = [count, time.perf_counter() - start]
+        self.count = 0
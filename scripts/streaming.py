@@ -0,0 +1,211 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from scripts.level import grid_region
+from scripts.tilemap import TileMap, TILESIZE
+
+CHUNK_SIZE = 16 # In tiles, 256x256 px
+
+
+class Chunk:
+    def __init__(self, key, origin, layers, tiles):
+        self.key = key
+        self.origin = origin # Tile position of the chunk's top left cell
+        self.layers = layers # layer name -> the chunk's part of the layer grid
+        self.tiles = tiles # TileMap of the chunk's part of the collision layer
+
+
+class LevelStreamer:
+    # Splits a level into CHUNK_SIZE chunks and only keeps the ones around the camera loaded.
+    # Implements the same query api as TileMap so it can stand in for GameManager.tiles, and
+    # tiles_in_region like Level for drawing.
+    def __init__(self, level, layer="tiles", chunk_size=CHUNK_SIZE, margin=1, capacity=48, merge=True):
+        self.level = level
+        self.layer = layer
+        self.chunk_size = chunk_size
+        self.margin = margin # Chunks kept active around the ones the camera sees
+        self.capacity = capacity # Loaded chunks kept before the least recently used get evicted
+        self.merge = merge
+        self.flag_table = level.palette_flags
+
+        self.chunks = OrderedDict() # Least recently used first
+        self.active = set()
+        self.objects = {} # chunk key -> level objects waiting for the chunk to activate
+        self.spawned = set()
+
+        self.loads = 0
+        self.hits = 0
+        self.evictions = 0
+
+    def chunk_key(self, x, y):
+        # Chunk holding the tile at x, y
+        return ((x - self.level.origin[0])//self.chunk_size, (y - self.level.origin[1])//self.chunk_size)
+
+    def chunk_at(self, pos):
+        return self.chunk_key(int(pos[0]//TILESIZE), int(pos[1]//TILESIZE))
+
+    def add_object(self, obj):
+        key = self.chunk_at(obj["rect"])
+        if key in self.spawned:
+            return [obj]
+        self.objects.setdefault(key, []).append(obj)
+        return []
+
+    def get_chunk(self, key):
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            chunk = self.load_chunk(key)
+            self.chunks[key] = chunk
+            self.loads += 1
+        else:
+            self.chunks.move_to_end(key)
+            self.hits += 1
+        return chunk
+
+    def load_chunk(self, key):
+        size = self.chunk_size
+        cx, cy = key
+        origin = [self.level.origin[0]+cx*size, self.level.origin[1]+cy*size]
+
+        layers = {}
+        for layer in self.level.layer_names:
+            layers[layer] = self.level.read_region(layer, cx*size, cy*size, (cx+1)*size, (cy+1)*size)
+
+        grid = layers.get(self.layer)
+        if grid is None:
+            grid = np.zeros((0, 0), dtype=np.uint16)
+        tiles = TileMap(grid, self.flag_table, origin, self.layer)
+        if self.merge:
+            tiles.merge_solids(size)
+        return Chunk(key, origin, layers, tiles)
+
+    def evict(self):
+        while len(self.chunks) > self.capacity:
+            key = next(iter(self.chunks))
+            if key in self.active:
+                break # Active chunks were touched last, so everything left is in use
+            del self.chunks[key]
+            self.evictions += 1
+
+    def update(self, view):
+        # view is [left, top, right, bottom] in pixels. Returns the objects of chunks that just became active.
+        x0, y0 = self.chunk_at(view[:2])
+        x1, y1 = self.chunk_at(view[2:])
+
+        active = set()
+        spawn = []
+        for cy in range(y0-self.margin, y1+self.margin+1):
+            for cx in range(x0-self.margin, x1+self.margin+1):
+                key = (cx, cy)
+                active.add(key)
+                self.get_chunk(key)
+
+                if key not in self.spawned:
+                    self.spawned.add(key)
+                    spawn += self.objects.pop(key, [])
+
+        self.active = active
+        self.evict()
+        return spawn
+
+    def reload(self, level):
+        # Switches to a new version of the level, loaded chunks whose cells changed get rebuilt.
+        # Returns how many chunks were rebuilt.
+        old = self.level
+        self.level = level
+        self.flag_table = level.palette_flags
+
+        if old.origin != level.origin or old.shape != level.shape:
+            self.chunks.clear()
+            return 0
+
+        rebuilt = 0
+        size = self.chunk_size
+        for key, chunk in list(self.chunks.items()):
+            cx, cy = key
+            changed = set(chunk.layers) != set(level.layer_names)
+            for layer in level.layer_names:
+                if changed:
+                    break
+                region = level.read_region(layer, cx*size, cy*size, (cx+1)*size, (cy+1)*size)
+                changed = not np.array_equal(region, chunk.layers[layer])
+            if changed:
+                self.chunks[key] = self.load_chunk(key)
+                rebuilt += 1
+        return rebuilt
+
+    def remove_object(self, obj):
+        # Drops an object that is still waiting for its chunk, returns False if it was already spawned
+        waiting = self.objects.get(self.chunk_at(obj["rect"]), [])
+        if obj in waiting:
+            waiting.remove(obj)
+            return True
+        return False
+
+    def is_active(self, rect):
+        return self.chunk_at(rect.center) in self.active
+
+    def stats(self):
+        return {"loaded": len(self.chunks), "active": len(self.active), "loads": self.loads, "hits": self.hits, "evictions": self.evictions}
+
+    def region(self, layer, x0, y0, x1, y1):
+        # Same as Level.region, the tiles of every chunk are put back in row order so overlapping
+        # sprites stack the same way they do without streaming
+        parts = [[], [], []]
+        cx0, cy0 = self.chunk_key(x0, y0)
+        cx1, cy1 = self.chunk_key(x1, y1)
+        for cy in range(cy0, cy1+1):
+            for cx in range(cx0, cx1+1):
+                chunk = self.get_chunk((cx, cy))
+                if layer in chunk.layers:
+                    for part, array in zip(parts, grid_region(chunk.layers[layer], chunk.origin, x0, y0, x1, y1)):
+                        part.append(array)
+
+        if not parts[0]:
+            empty = np.zeros(0, dtype=np.intp)
+            return [empty, empty, empty]
+        refs, xs, ys = [np.concatenate(part) for part in parts]
+        order = np.lexsort((xs, ys))
+        return [refs[order], xs[order], ys[order]]
+
+    def tiles_in_region(self, layer, x0, y0, x1, y1):
+        refs, xs, ys = self.region(layer, x0, y0, x1, y1)
+        return zip(refs.tolist(), xs.tolist(), ys.tolist())
+
+    def query(self, x0, y0, x1, y1):
+        tiles = []
+        l_ramps = []
+        r_ramps = []
+
+        cx0, cy0 = self.chunk_key(x0, y0)
+        cx1, cy1 = self.chunk_key(x1, y1)
+        for cy in range(cy0, cy1+1):
+            for cx in range(cx0, cx1+1):
+                rects = self.get_chunk((cx, cy)).tiles.query(x0, y0, x1, y1)
+                tiles += rects[0]
+                l_ramps += rects[1]
+                r_ramps += rects[2]
+
+        return [tiles, l_ramps, r_ramps]
+
+    def solid_region(self, x0, y0, x1, y1):
+        solid = np.zeros((y1-y0+1, x1-x0+1), dtype=bool)
+        cx0, cy0 = self.chunk_key(x0, y0)
+        cx1, cy1 = self.chunk_key(x1, y1)
+        for cy in range(cy0, cy1+1):
+            for cx in range(cx0, cx1+1):
+                solid |= self.get_chunk((cx, cy)).tiles.solid_region(x0, y0, x1, y1)
+        return solid
+
+    def query_rect(self, rect):
+        x0 = int(rect[0]//TILESIZE)
+        y0 = int(rect[1]//TILESIZE)
+        x1 = int((rect[0]+rect[2]-1)//TILESIZE)
+        y1 = int((rect[1]+rect[3]-1)//TILESIZE)
+        return self.query(x0, y0, x1, y1)
+
+    def query_near(self, pos, tile_radius):
+        tile_x = int(pos[0]/TILESIZE)
+        tile_y = int(pos[1]/TILESIZE)
+        return self.query(tile_x-tile_radius, tile_y-tile_radius, tile_x+tile_radius, tile_y+tile_radius)
@@ -0,0 +1,209 @@
+import pygame
+import math
+import numpy as np
+
+from scripts.level import SOLID, R_RAMP, L_RAMP, RAMPS
+
+TILESIZE = 16
+
+
+class TileMap:
+    def __init__(self, grid, flag_table, origin, layer="tiles"):
+        # grid holds palette refs indexed [y, x], origin is the tile position of grid[0, 0]
+        self.origin = list(origin)
+        self.layer = layer
+        self.tile_ids = grid
+        self.flag_table = flag_table
+        self.flags = flag_table[grid]
+
+        # Solid tiles merged into bigger rects, see merge_solids()
+        self.merged_rects = None
+        self.rect_ids = None
+        self.free_ids = [] # Slots of merged_rects freed by _merge_block, reused before the list grows
+        self.block_size = 0
+
+    @staticmethod
+    def from_level(level, layer="tiles"):
+        if layer in level.layers:
+            grid = level.layers[layer]
+        else:
+            grid = np.zeros(level.shape, dtype=np.uint16)
+        return TileMap(grid, level.palette_flags, level.origin, layer)
+
+    @property
+    def width(self):
+        return self.flags.shape[1]
+
+    @property
+    def height(self):
+        return self.flags.shape[0]
+
+    def set_tile(self, x, y, ref, autotiler=None):
+        # With an autotiler the cells around the changed one get retiled too
+        gx = x - self.origin[0]
+        gy = y - self.origin[1]
+        self.tile_ids[gy, gx] = ref
+        self.flags[gy, gx] = self.flag_table[ref]
+
+        changed = [[gx, gy]]
+        if autotiler is not None:
+            for cx, cy, new in autotiler.retile_cell(self.layer, self.tile_ids, gx, gy):
+                self.flags[cy, cx] = self.flag_table[new]
+                changed.append([cx, cy])
+
+        if self.merged_rects is not None:
+            for block in {(cx//self.block_size, cy//self.block_size) for cx, cy in changed}:
+                self._merge_block(*block)
+
+    def set_tiles(self, cells):
+        # cells is [[x, y, ref], ...], each touched block only gets merged again once
+        blocks = set()
+        for x, y, ref in cells:
+            gx = x - self.origin[0]
+            gy = y - self.origin[1]
+            self.tile_ids[gy, gx] = ref
+            self.flags[gy, gx] = self.flag_table[ref]
+            if self.merged_rects is not None:
+                blocks.add((gx//self.block_size, gy//self.block_size))
+
+        for block in blocks:
+            self._merge_block(*block)
+
+    def get_flags(self, x, y):
+        gx = x - self.origin[0]
+        gy = y - self.origin[1]
+        if 0 <= gx < self.width and 0 <= gy < self.height:
+            return int(self.flags[gy, gx])
+        return 0
+
+    def merge_solids(self, block_size=16):
+        # Greedily merges runs of solid tiles into maximal rects. Rects never cross a block_size block
+        # so a changed tile only needs its own block rebuilt. Ramps are left as single tiles.
+        self.block_size = block_size
+        self.merged_rects = []
+        self.free_ids = []
+        self.rect_ids = np.full(self.flags.shape, -1, dtype=np.int32)
+
+        for by in range(math.ceil(self.height/block_size)):
+            for bx in range(math.ceil(self.width/block_size)):
+                self._merge_block(bx, by)
+
+    def _merge_block(self, bx, by):
+        size = self.block_size
+        gx0 = bx*size
+        gy0 = by*size
+        ids = self.rect_ids[gy0:gy0+size, gx0:gx0+size]
+
+        for rect_id in np.unique(ids).tolist():
+            if rect_id >= 0:
+                self.merged_rects[rect_id] = None
+                self.free_ids.append(rect_id)
+        ids[:] = -1
+
+        solid = ((self.flags[gy0:gy0+size, gx0:gx0+size] & SOLID) != 0).tolist()
+        height = len(solid)
+        width = len(solid[0]) if height else 0
+
+        for y in range(height):
+            row = solid[y]
+            x = 0
+            while x < width:
+                if not row[x]:
+                    x += 1
+                    continue
+
+                x2 = x
+                while x2 < width and row[x2]:
+                    row[x2] = False
+                    x2 += 1
+
+                y2 = y+1
+                while y2 < height and all(solid[y2][x:x2]):
+                    for i in range(x, x2):
+                        solid[y2][i] = False
+                    y2 += 1
+
+                rect = pygame.Rect((gx0+x+self.origin[0])*TILESIZE, (gy0+y+self.origin[1])*TILESIZE, (x2-x)*TILESIZE, (y2-y)*TILESIZE)
+                if self.free_ids:
+                    rect_id = self.free_ids.pop()
+                    self.merged_rects[rect_id] = rect
+                else:
+                    rect_id = len(self.merged_rects)
+                    self.merged_rects.append(rect)
+                ids[y:y2, x:x2] = rect_id
+                x = x2
+
+    def rect_counts(self):
+        # [solid tiles, merged rects, ramps]
+        solid = int(np.count_nonzero(self.flags & SOLID))
+        ramps = int(np.count_nonzero(self.flags & RAMPS))
+        if self.merged_rects is None:
+            return [solid, solid, ramps]
+        return [solid, sum(1 for rect in self.merged_rects if rect is not None), ramps]
+
+    def query(self, x0, y0, x1, y1):
+        # Collision rects of every cell in the inclusive tile region, returned as [tiles, l_ramps, r_ramps]
+        tiles = []
+        l_ramps = []
+        r_ramps = []
+
+        gx0 = max(x0 - self.origin[0], 0)
+        gy0 = max(y0 - self.origin[1], 0)
+        gx1 = min(x1 - self.origin[0] + 1, self.width)
+        gy1 = min(y1 - self.origin[1] + 1, self.height)
+        if gx0 >= gx1 or gy0 >= gy1:
+            return [tiles, l_ramps, r_ramps]
+
+        window = self.flags[gy0:gy1, gx0:gx1]
+
+        if self.merged_rects is not None:
+            for rect_id in np.unique(self.rect_ids[gy0:gy1, gx0:gx1]).tolist():
+                if rect_id >= 0:
+                    tiles.append(self.merged_rects[rect_id])
+            window = window & RAMPS
+
+        ys, xs = np.nonzero(window)
+        if len(ys) == 0:
+            return [tiles, l_ramps, r_ramps]
+
+        base_x = gx0 + self.origin[0]
+        base_y = gy0 + self.origin[1]
+        for kind, x, y in zip(window[ys, xs].tolist(), xs.tolist(), ys.tolist()):
+            rect = pygame.Rect((x+base_x)*TILESIZE, (y+base_y)*TILESIZE, TILESIZE, TILESIZE)
+            if kind & SOLID:
+                tiles.append(rect)
+            elif kind & R_RAMP:
+                r_ramps.append(rect)
+            elif kind & L_RAMP:
+                l_ramps.append(rect)
+
+        return [tiles, l_ramps, r_ramps]
+
+    def solid_region(self, x0, y0, x1, y1):
+        # [y, x] bools of the inclusive tile region, True where the tile is solid. Cells off the map are False
+        solid = np.zeros((y1-y0+1, x1-x0+1), dtype=bool)
+
+        gx0 = max(x0 - self.origin[0], 0)
+        gy0 = max(y0 - self.origin[1], 0)
+        gx1 = min(x1 - self.origin[0] + 1, self.width)
+        gy1 = min(y1 - self.origin[1] + 1, self.height)
+        if gx0 >= gx1 or gy0 >= gy1:
+            return solid
+
+        ox = self.origin[0] - x0
+        oy = self.origin[1] - y0
+        solid[gy0+oy:gy1+oy, gx0+ox:gx1+ox] = (self.flags[gy0:gy1, gx0:gx1] & SOLID) != 0
+        return solid
+
+    def query_rect(self, rect):
+        # Collision rects overlapping a pixel space AABB
+        x0 = int(rect[0]//TILESIZE)
+        y0 = int(rect[1]//TILESIZE)
+        x1 = int((rect[0]+rect[2]-1)//TILESIZE)
+        y1 = int((rect[1]+rect[3]-1)//TILESIZE)
+        return self.query(x0, y0, x1, y1)
+
+    def query_near(self, pos, tile_radius):
+        tile_x = int(pos[0]/TILESIZE)
+        tile_y = int(pos[1]/TILESIZE)
+        return self.query(tile_x-tile_radius, tile_y-tile_radius, tile_x+tile_radius, tile_y+tile_radius)
@@ -1,18 +1,12 @@
 import pygame
 import random
 import math
-from scripts.Engine import blit_center
+from scripts.Engine import blit_center, rotation_cache, outline_cache
 
-def slash_outline(img, surf, loc, color, colorkey=(0,0,0), colorkey2=(0,0,0)):
-    img.set_colorkey(colorkey)
-    mask = pygame.mask.from_surface(img)
-    mask_surf = mask.to_surface(setcolor=color)
-    mask_surf.set_colorkey((0,0,0))
+slash_frames = {} # SlashVFX.frame_key() -> surfaces, frame i is what the slash shows on its i-th frame
 
-    blit_center(surf, mask_surf,(loc[0]-1,loc[1]))
-    blit_center(surf, mask_surf,(loc[0]+1,loc[1]))
-    blit_center(surf, mask_surf,(loc[0],loc[1]-1))
-    blit_center(surf, mask_surf,(loc[0],loc[1]+1))
+def slash_outline(img, surf, loc, color, colorkey=(0,0,0), colorkey2=(0,0,0)):
+    blit_center(surf, outline_cache.get(img, color, colorkey), loc)
 
 class SlashVFX:
     def __init__(self, x, y, width, height, speed, slash_size, slash_size_change, roll_down_speed, color, radius, angle, lifetime, shape="circle", truncation=0, cutout_radius=-1, cutout_center=[-1, -1], roll_down_axis="vertical"):
@@ -43,38 +37,55 @@ class SlashVFX:
         self.active_time = 0
         self.lifetime = lifetime
 
+        self.frames = slash_frames.setdefault(self.frame_key(), [])
         self.generate_slash()
 
     
-    def generate_slash(self):
-        if self.shape in ["circle", "truncated_arc"]:
-            surf_size = (self.radius*2, self.radius*2)
+    def frame_key(self):
+        # Everything the slash's frames depend on, the same key always goes through the same frames
+        return (self.width, self.height, self.slash_size, self.slash_size_change, self.roll_down_speed, tuple(self.color), self.radius,
+                self.shape, self.truncation, self.cutout_radius, tuple(self.cutout_center), self.roll_down_axis)
 
-            temp_surf = pygame.Surface(surf_size).convert_alpha()
+    def render_slash(self):
+        surf_size = (self.radius*2, self.radius*2)
 
-            pygame.draw.circle(temp_surf, self.color, (self.radius, self.radius), self.radius)
+        temp_surf = pygame.Surface(surf_size).convert_alpha()
 
-            if self.cutout_radius == -1:
-                pygame.draw.circle(temp_surf, (0, 0, 0), (self.slash_size, self.radius), self.radius)
+        pygame.draw.circle(temp_surf, self.color, (self.radius, self.radius), self.radius)
+
+        if self.cutout_radius == -1:
+            pygame.draw.circle(temp_surf, (0, 0, 0), (self.slash_size, self.radius), self.radius)
+        else:
+            if self.cutout_center != [-1, -1]:
+                pygame.draw.circle(temp_surf, (0, 0, 0), self.cutout_center, self.cutout_radius)
             else:
-                if self.cutout_center != [-1, -1]:
-                    pygame.draw.circle(temp_surf, (0, 0, 0), self.cutout_center, self.cutout_radius)
-                else:
-                    pygame.draw.circle(temp_surf, (0, 0, 0), (0, self.radius), self.radius)
+                pygame.draw.circle(temp_surf, (0, 0, 0), (0, self.radius), self.radius)
 
-            if self.shape == "truncated_arc":
-                height = self.radius*2*self.truncation
-                pygame.draw.rect(temp_surf, (0, 0, 0), (0, self.radius*2-height, self.radius*2, self.radius*2))
+        if self.shape == "truncated_arc":
+            height = self.radius*2*self.truncation
+            pygame.draw.rect(temp_surf, (0, 0, 0), (0, self.radius*2-height, self.radius*2, self.radius*2))
 
-            if self.roll_down <= self.radius*2:
-                if self.roll_down_axis == "vertical":
-                    pygame.draw.rect(temp_surf, (0, 0, 0), (0, self.roll_down, self.radius*2, self.radius*2))
-                elif self.roll_down_axis == "horizontal":
-                    pygame.draw.rect(temp_surf, (0, 0, 0), (self.radius*2-self.roll_down, 0, self.radius*2, self.radius*2))
+        if self.roll_down <= self.radius*2:
+            if self.roll_down_axis == "vertical":
+                pygame.draw.rect(temp_surf, (0, 0, 0), (0, self.roll_down, self.radius*2, self.radius*2))
+            elif self.roll_down_axis == "horizontal":
+                pygame.draw.rect(temp_surf, (0, 0, 0), (self.radius*2-self.roll_down, 0, self.radius*2, self.radius*2))
 
-            temp_surf.set_colorkey((0, 0, 0))
+        temp_surf.set_colorkey((0, 0, 0))
 
-            self.surface = pygame.transform.scale(temp_surf, (self.width, self.height))
+        # Frames are kept and blitted over and over, a colorkeyed surface draws faster than one with alpha
+        surf = pygame.transform.scale(temp_surf, (self.width, self.height)).convert()
+        surf.set_colorkey((0, 0, 0), pygame.RLEACCEL)
+        return surf
+
+    def generate_slash(self):
+        if self.shape in ["circle", "truncated_arc"]:
+            # Frames are shared by every slash with the same key, the first one to reach a frame draws it
+            if self.active_time < len(self.frames):
+                self.surface = self.frames[self.active_time]
+            else:
+                self.surface = self.render_slash()
+                self.frames.append(self.surface)
 
             self.slash_size += self.slash_size_change
             self.roll_down += self.roll_down_speed
@@ -89,10 +100,19 @@ class SlashVFX:
             if self.active_time > self.lifetime:
                 self.active = False
 
-    def draw(self, screen, scroll):
-        slash_outline(pygame.transform.rotate(pygame.transform.flip(self.surface, False, self.flip), self.angle), screen, (self.x-scroll[0], self.y-scroll[1]), (255, 255, 255))
-        blit_center(screen, pygame.transform.rotate(pygame.transform.flip(self.surface, False, self.flip), self.angle), (self.x-scroll[0], self.y-scroll[1]))
+    def get_bounds(self):
+        # Covers the slash at any angle, plus its outline
+        size = math.hypot(self.width, self.height)+2
+        return pygame.FRect(self.x-size/2, self.y-size/2, size, size)
+
+    def update(self):
         self.generate_slash()
 
+    def draw(self, screen, scroll):
+        # Only draws, update() moves the slash on to its next frame
+        image = rotation_cache.rotate(self.surface, self.angle, False, self.flip)
+        slash_outline(image, screen, (self.x-scroll[0], self.y-scroll[1]), (255, 255, 255))
+        blit_center(screen, image, (self.x-scroll[0], self.y-scroll[1]))
+
 
 
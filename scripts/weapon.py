@@ -1,10 +1,14 @@
 import pygame
 import random
 import math
-from scripts.Engine import blit_center, Timer
+from scripts.Engine import blit_center, Timer, rotation_cache
 from scripts.vfx import SlashVFX
 from scripts.projectile import *
 
+SLASH_VARIANTS = 8 # Random slash sizes a weapon picks from, each one has its frames drawn when the weapon is made
+slash_variants = {} # Weapon name -> its slash sizes, rolled once so later weapons of that name reuse their frames
+weapon_images = {} # Asset image -> the widened image weapons draw, shared so its prebaked rotations are too
+
 
 class Slash(SlashVFX):
     def __init__(self, owner, damage, crit, lifetime, flip, x, y, width, height, speed, slash_size, slash_size_change, roll_down_speed, color, radius, angle, shape="circle", truncation=0, cutout_radius=-1, cutout_center=[-1, -1], roll_down_axis="vertical"):
@@ -19,7 +23,7 @@ class Slash(SlashVFX):
         super().draw(surf, scroll)
 
     def did_collide(self, entity_rect: pygame.Rect, entity_mask):
-        mask = pygame.mask.from_surface(pygame.transform.rotate(pygame.transform.flip(self.surface, False, self.flip), self.angle))
+        mask = pygame.mask.from_surface(rotation_cache.rotate(self.surface, self.angle, False, self.flip))
 
         if mask.overlap(entity_mask, [entity_rect.x-(self.x-self.width/2), entity_rect.y-(self.y-self.height/2)]) != None:
             return True
@@ -38,11 +42,14 @@ class Slash(SlashVFX):
 
 class Weapon:
     def __init__(self, name, image: pygame.Surface, data):
-        surf = pygame.Surface((image.get_width()*2, image.get_height()))
-        surf.blit(image, (image.get_width(), 0))
-        surf.set_colorkey(image.get_colorkey())
-
-        self.image = surf
+        if image not in weapon_images:
+            surf = pygame.Surface((image.get_width()*2, image.get_height()))
+            surf.blit(image, (image.get_width(), 0))
+            surf.set_colorkey(image.get_colorkey())
+            weapon_images[image] = surf
+
+        self.image = weapon_images[image]
+        rotation_cache.prebake(name, self.image)
         self.data = data
         self.name = name
 
@@ -53,18 +60,33 @@ class Weapon:
         self.cooldown_timer = Timer(self.attack_cooldown)
 
         self.slash_info = data["slash_info"]
+        self.slash_variants = slash_variants.get(name)
+        if self.slash_variants is None:
+            self.slash_variants = []
+            for i in range(SLASH_VARIANTS):
+                self.slash_variants.append([random.randint(self.slash_info["width"][0], self.slash_info["width"][1]), random.randint(self.slash_info["height"][0], self.slash_info["height"][1]), random.randint(self.slash_info["slash_size"][0], self.slash_info["slash_size"][1])])
+            slash_variants[name] = self.slash_variants
+            self.prebake_slashes()
+
+    def prebake_slashes(self):
+        # Runs a slash of every variant to the end, which draws all of their frames
+        for width, height, slash_size in self.slash_variants:
+            slash = SlashVFX(0, 0, width, height, self.slash_info["speed"], slash_size, self.slash_info["slash_change_size"], self.slash_info["roll_down_speed"], self.slash_info["color"], self.slash_info["radius"], 0, self.slash_info["lifetime"], self.slash_info["shape"], self.slash_info["truncation"], self.slash_info["cutout_radius"], self.slash_info["cutout_center"], self.slash_info["roll_down_axis"])
+            while slash.active:
+                slash.generate_slash()
 
     def attack(self, pos, angle, owner, slash_list: list, flip=False):
         if self.can_attack:
             is_crit = random.random() < self.crit_rate
-            slash = Slash(owner, self.dmg, is_crit, self.slash_info["lifetime"], flip, pos[0], pos[1], random.randint(self.slash_info["width"][0], self.slash_info["width"][1]), random.randint(self.slash_info["height"][0], self.slash_info["height"][1]), self.slash_info["speed"], random.randint(self.slash_info["slash_size"][0], self.slash_info["slash_size"][1]), self.slash_info["slash_change_size"], self.slash_info["roll_down_speed"], self.slash_info["color"], self.slash_info["radius"], angle, self.slash_info["shape"], self.slash_info["truncation"], cutout_radius=self.slash_info["cutout_radius"], cutout_center=self.slash_info["cutout_center"], roll_down_axis=self.slash_info["roll_down_axis"])
+            width, height, slash_size = random.choice(self.slash_variants)
+            slash = Slash(owner, self.dmg, is_crit, self.slash_info["lifetime"], flip, pos[0], pos[1], width, height, self.slash_info["speed"], slash_size, self.slash_info["slash_change_size"], self.slash_info["roll_down_speed"], self.slash_info["color"], self.slash_info["radius"], angle, self.slash_info["shape"], self.slash_info["truncation"], cutout_radius=self.slash_info["cutout_radius"], cutout_center=self.slash_info["cutout_center"], roll_down_axis=self.slash_info["roll_down_axis"])
 
             slash_list.append(slash)
             self.can_attack = False
             self.cooldown_timer.set()
 
     def draw(self, pos, angle, surf, scroll):
-        blit_center(surf, pygame.transform.rotate(self.image, angle), [pos[0]-scroll[0], pos[1]-scroll[1]])
+        blit_center(surf, rotation_cache.rotate(self.image, angle), [pos[0]-scroll[0], pos[1]-scroll[1]])
 
     def update(self):
         self.cooldown_timer.update()
@@ -1,15 +1,30 @@
 import pygame
+import time
+
+# How the display surface gets onto the window:
+#   scale      - transform.scale into a new surface every frame, then blit that to the window
+#   scale_into - transform.scale straight into the window surface, nothing gets allocated
+#   native     - the window is opened at the display's size and SDL's SCALED renderer does the only upscale
+PRESENT_MODES = ["scale", "scale_into", "native"]
 
 
 class Window():
-    def __init__(self, width, height, caption, display=None, opengl_enabled=False):
+    def __init__(self, width, height, caption, display=None, opengl_enabled=False, present_mode="scale_into"):
+        if present_mode not in PRESENT_MODES:
+            raise ValueError(f"Unknown present mode {present_mode}, expected one of {PRESENT_MODES}")
+
         self.width = width
         self.height = height
         self.caption = caption
         self.use_opengl = opengl_enabled
         self.display = display # If a surface is passed, everything will be rendered on that and will be upscaled
+        self.present_mode = present_mode
+        self.present_time = 0 # Seconds the last update() took
 
-        self.window = pygame.display.set_mode((self.width, self.height), pygame.SCALED)
+        if self.display != None and self.present_mode == "native":
+            self.window = pygame.display.set_mode(self.display.get_size(), pygame.SCALED)
+        else:
+            self.window = pygame.display.set_mode((self.width, self.height), pygame.SCALED)
         pygame.display.set_caption(self.caption)
     
     def fill(self, fill_color):
@@ -36,10 +51,17 @@ class Window():
             return -1
     
     def update(self):
+        start = time.perf_counter()
         if self.display:
-            self.window.blit(pygame.transform.scale(self.display, (self.width, self.height)), (0, 0))
+            if self.present_mode == "scale":
+                self.window.blit(pygame.transform.scale(self.display, (self.width, self.height)), (0, 0))
+            elif self.present_mode == "scale_into":
+                pygame.transform.scale(self.display, self.window.get_size(), self.window)
+            else:
+                self.window.blit(self.display, (0, 0))
 
         pygame.display.update()
+        self.present_time = time.perf_counter() - start
     
     @property
     def events(self):
@@ -0,0 +1,133 @@
+# Reports the numbers that drive a level's runtime cost as json, so they can be diffed between revisions.
+# Run from the project root: python -m tools.analyze_level data/levels/debug2.lvl [more levels...] [--output report.json]
+import argparse
+import json
+import math
+import os
+import sys
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# TileMap pulls in pygame, whose banner would end up in front of the json on stdout
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import scripts.level as L
+from scripts.tilemap import TileMap, SOLID, RAMPS, TILESIZE
+
+TILESET_PATH = "data/images/tilesets/"
+VIEW = (400, 240)
+RADII = [1, 2, 3, 4] # get_tiles_near_object is called with 3 for the player
+
+
+def sprite_sizes():
+    # Size of every sprite of the json tilesets, png tilesets are all TILESIZE squares
+    sizes = {}
+    for filename in sorted(os.listdir(TILESET_PATH)):
+        if filename.endswith(".json"):
+            with open(TILESET_PATH + filename) as file:
+                data = json.load(file)
+            tileset = filename.split(".")[0]
+            for tile_id in data:
+                if tile_id != "path":
+                    sizes[(tileset, tile_id)] = [data[tile_id]["width"], data[tile_id]["height"]]
+    return sizes
+
+def window_max(cells, width, height):
+    # Largest sum of cells inside any width x height window, windows hanging over the edge included
+    padded = np.pad(cells.astype(np.int32), ((height-1, height-1), (width-1, width-1)))
+    table = np.zeros((padded.shape[0]+1, padded.shape[1]+1), dtype=np.int64)
+    table[1:, 1:] = padded.cumsum(0).cumsum(1)
+    sums = table[height:, width:] - table[:-height, width:] - table[height:, :-width] + table[:-height, :-width]
+    return int(sums.max()) if sums.size else 0
+
+def window_max_unique(ids, size):
+    # Largest number of distinct ids >= 0 inside any size x size window
+    padded = np.pad(ids, size-1, constant_values=-1)
+    windows = np.sort(sliding_window_view(padded, (size, size)).reshape(-1, size*size), axis=1)
+    distinct = (np.diff(windows, axis=1) != 0).sum(axis=1) + 1 - (windows[:, 0] < 0)
+    return int(distinct.max()) if distinct.size else 0
+
+def analyze(path):
+    level = L.parse_json(path)
+    sizes = sprite_sizes()
+    view_tiles = [VIEW[0]//TILESIZE + 1, VIEW[1]//TILESIZE + 1]
+
+    layers = {}
+    worst_view = 0
+    oversize = {}
+    for layer, grid in level.layers.items():
+        overhang = [0, 0]
+        for ref in level.layer_refs(layer):
+            size = sizes.get(level.palette[ref], [TILESIZE, TILESIZE])
+            overhang[0] = max(overhang[0], math.ceil(size[0]/TILESIZE)-1)
+            overhang[1] = max(overhang[1], math.ceil(size[1]/TILESIZE)-1)
+            if size != [TILESIZE, TILESIZE]:
+                name = f"{level.palette[ref][0]}/{level.palette[ref][1]}"
+                entry = oversize.setdefault(name, {"size": size, "count": 0})
+                entry["count"] += int(np.count_nonzero(grid == ref))
+
+        # The renderer widens the view by the overhang so big sprites starting off screen still get drawn
+        in_view = window_max(grid != 0, view_tiles[0]+overhang[0], view_tiles[1]+overhang[1])
+        worst_view += in_view
+        layers[layer] = {"tiles": level.tile_count(layer), "worst_tiles_in_view": in_view, "overhang": overhang}
+
+    tiles = TileMap.from_level(level)
+    solid = tiles.flags & SOLID
+    ramps = (tiles.flags & RAMPS) != 0
+    tiles.merge_solids()
+    solid_count, merged_count, ramp_count = tiles.rect_counts()
+
+    candidates = {}
+    for radius in RADII:
+        size = radius*2 + 1
+        # Merged rects found in the window plus ramps, which are never merged
+        candidates[str(radius)] = {
+            "tiles": window_max(solid | ramps, size, size),
+            "merged": window_max_unique(np.where(ramps, -1, tiles.rect_ids), size) + window_max(ramps, size, size),
+        }
+
+    enemies = {}
+    for i in level.enemy_objects:
+        name = level.objects[i]["name"]
+        enemies[name] = enemies.get(name, 0) + 1
+
+    battle_rooms = []
+    for room in level.battle_rooms:
+        battle_rooms.append({"waves": room["waves"], "exits": len(room["exits"]), "enemies": [len(group) for group in room["enemies"]]})
+
+    return {
+        "size": [level.width, level.height],
+        "layers": layers,
+        "worst_tiles_in_view": worst_view,
+        "solid_tiles": solid_count,
+        "solid_rects": merged_count,
+        "ramps": ramp_count,
+        "oversize_sprites": oversize,
+        "worst_collision_candidates": candidates,
+        "objects": len(level.objects),
+        "enemies": enemies,
+        "enemy_count": len(level.enemy_objects),
+        "battle_rooms": battle_rooms,
+        "battle_enemy_count": sum(sum(room["enemies"]) for room in battle_rooms),
+        "errors": L.validate_level(level),
+    }
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Report the runtime cost of levels as json")
+    parser.add_argument("paths", nargs="+", help=".lvl files")
+    parser.add_argument("--output", default=None, help="write the report here instead of stdout")
+    args = parser.parse_args(args)
+
+    report = {path: analyze(path) for path in args.paths}
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output is None:
+        print(text)
+    else:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
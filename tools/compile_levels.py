@@ -0,0 +1,89 @@
+# Validates every level and writes its compiled .lvlc copy, one level per process.
+# Run from the project root: python -m tools.compile_levels [levels...] [--force] [--check] [--jobs N]
+import argparse
+import json
+import os
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import scripts.level as L
+
+LEVEL_PATH = "data/levels/"
+
+
+def read_cache(cache, digest, name):
+    # An unreadable compiled copy only means the level needs compiling again
+    try:
+        return L.read_compiled(cache, digest, name)
+    except (OSError, ValueError, IndexError, BufferError, struct.error):
+        return None
+
+def compile_file(path, force=False, check=False):
+    # Returns [path, status, errors, seconds], status is "compiled", "up to date", "ok" or "failed"
+    start = time.perf_counter()
+    try:
+        with open(path, "rb") as file:
+            source = file.read()
+        digest = L.source_digest(source)
+        cache = L.compiled_path(path)
+
+        if not force and not check:
+            level = read_cache(cache, digest, L.level_name(path))
+            if level is not None:
+                return [path, "up to date", [], time.perf_counter() - start]
+
+        level = L.from_json(json.loads(source), L.level_name(path))
+        errors = L.validate_level(level)
+        if errors:
+            return [path, "failed", errors, time.perf_counter() - start]
+        if check:
+            return [path, "ok", [], time.perf_counter() - start]
+
+        L.write_compiled(level, cache, digest)
+    except (OSError, ValueError, KeyError, TypeError, struct.error) as e:
+        return [path, "failed", [f"{type(e).__name__}: {e}"], time.perf_counter() - start]
+
+    return [path, "compiled", [], time.perf_counter() - start]
+
+def find_levels(paths):
+    levels = []
+    for path in paths:
+        if os.path.isdir(path):
+            levels += [os.path.join(path, filename) for filename in sorted(os.listdir(path)) if filename.endswith(".lvl")]
+        else:
+            levels.append(path)
+    return levels
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Compile .lvl levels into .lvlc files")
+    parser.add_argument("paths", nargs="*", default=[LEVEL_PATH], help="level files or folders, defaults to data/levels")
+    parser.add_argument("--force", action="store_true", help="rebuild levels that are already up to date")
+    parser.add_argument("--check", action="store_true", help="only validate, don't write anything")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes, defaults to the cpu count")
+    args = parser.parse_args(args)
+
+    levels = find_levels(args.paths)
+    if not levels:
+        print("No levels found")
+        return 1
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        results = list(pool.map(compile_file, levels, [args.force]*len(levels), [args.check]*len(levels)))
+
+    failed = 0
+    for path, status, errors, seconds in results:
+        print(f"{path:<32}{status:>12}{seconds*1000:>9.1f}ms")
+        for error in errors:
+            print(f"    {error}")
+        if status == "failed":
+            failed += 1
+
+    print(f"{len(levels)} levels, {failed} failed in {(time.perf_counter() - start)*1000:.1f}ms")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
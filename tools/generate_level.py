@@ -0,0 +1,186 @@
+# Generates .lvl files for profiling: rolling ground with ramps and pits, floating platforms, trees,
+# a spawn, enemies and battle rooms. The same arguments and seed always give the same file.
+# Run from the project root: python -m tools.generate_level out.lvl --width 2000 --enemies 200 --seed 3
+import argparse
+import json
+import random
+import sys
+
+import scripts.level as L
+
+TILESIZE = 16
+
+GROUND = ["tileset_green", 5]
+GROUND_TOP = ["tileset_green", 2]
+PLATFORM = ["tileset_cherry", 2]
+TREES = ["tree 1", "tree 2"]
+TREE_SIZE = [5, 4] # 80x64 px in tiles
+
+ENEMY_SIZES = {"Dummy": [2, 2], "drone": [1, 1], "Roller": [1, 1], "Lazer Orb": [1, 1]}
+FLYING = ["drone", "Lazer Orb"]
+DEFAULT_MIX = "drone=3,Roller=1,Lazer Orb=1,Dummy=1"
+
+SPAWN_AREA = 16 # Flat, enemy free columns at the start of the level
+ROOM_SIZE = [20, 12]
+MIN_WIDTH = SPAWN_AREA + ROOM_SIZE[0] + 5 # The spawn area and a battle room with its exits
+
+
+def parse_mix(mix):
+    # "drone=3,Roller=1" -> {"drone": 3.0, "Roller": 1.0}
+    weights = {}
+    for entry in mix.split(","):
+        name, weight = entry.rsplit("=", 1)
+        name = name.strip()
+        if name not in ENEMY_SIZES:
+            raise ValueError(f"unknown enemy {name!r}, expected one of {', '.join(ENEMY_SIZES)}")
+        weights[name] = float(weight)
+    return weights
+
+def ground_heights(rng, width, height, density):
+    # Surface row per column, None for pits. Steps are at most one tile so every one gets a ramp.
+    low = height//3
+    high = height-3
+    surface = high - 2
+    heights = []
+    pit = 0
+    for x in range(width):
+        if x >= SPAWN_AREA:
+            if pit > 0:
+                pit -= 1
+                heights.append(None)
+                continue
+            if rng.random() > density and heights[-1] is not None:
+                pit = rng.randint(2, 4) - 1
+                heights.append(None)
+                continue
+            if rng.random() < 0.3:
+                surface = min(max(surface + rng.choice([-1, 1]), low), high)
+        heights.append(surface)
+    return heights
+
+def generate(width=400, height=60, density=0.9, enemies=20, mix=DEFAULT_MIX, battle_rooms=1, waves=2, wave_size=4, trees=None, seed=0):
+    if width < MIN_WIDTH:
+        raise ValueError(f"width must be at least {MIN_WIDTH} tiles, got {width}")
+    rng = random.Random(seed)
+    weights = parse_mix(mix)
+    if trees is None:
+        trees = width//25
+
+    tiles = {}
+    def place(x, y, tile):
+        tiles[f"{x}/{y}"] = [tile[0], tile[1], [x, y]]
+
+    heights = ground_heights(rng, width, height, density)
+    for x, surface in enumerate(heights):
+        if surface is None:
+            continue
+        place(x, surface, GROUND_TOP)
+        for y in range(surface+1, height):
+            place(x, y, GROUND)
+
+    for x in range(width-1):
+        left = heights[x]
+        right = heights[x+1]
+        if left is None or right is None:
+            continue
+        if right == left-1:
+            place(x, left-1, ["tileset_green", L.R_RAMP_TILE])
+        elif right == left+1:
+            place(x+1, right-1, ["tileset_green", L.L_RAMP_TILE])
+
+    for i in range(int(width*density/12)):
+        x = rng.randrange(SPAWN_AREA, width-6)
+        ground = min([h for h in heights[x:x+6] if h is not None] or [height-3])
+        y = ground - rng.randint(4, 6)
+        for j in range(rng.randint(3, 6)):
+            place(x+j, y, PLATFORM)
+
+    for i in range(trees):
+        x = rng.randrange(0, width-TREE_SIZE[0])
+        surface = heights[x]
+        # Trees need flat ground under their whole width
+        if surface is None or any(h != surface for h in heights[x:x+TREE_SIZE[0]]):
+            continue
+        key = f"{x}/{surface-TREE_SIZE[1]}"
+        if key not in tiles:
+            place(x, surface-TREE_SIZE[1], ["trees", rng.choice(TREES)])
+
+    objects = [{"rect": [2*TILESIZE, (heights[2]-1)*TILESIZE, TILESIZE, TILESIZE], "name": "Spawn", "properties": {}}]
+
+    columns = [x for x in range(SPAWN_AREA, width-2) if heights[x] is not None]
+    names = list(weights)
+    for name in rng.choices(names, [weights[name] for name in names], k=enemies if columns else 0):
+        x = rng.choice(columns)
+        size = ENEMY_SIZES[name]
+        lift = 4 if name in FLYING else 0
+        y = heights[x] - size[1] - lift
+        objects.append({"rect": [x*TILESIZE, y*TILESIZE, size[0]*TILESIZE, size[1]*TILESIZE], "name": name, "properties": {}})
+
+    # Battle rooms are spread evenly over the level after the spawn. Waves only spawn drones,
+    # that's the only enemy begin_battle knows about.
+    spacing = (width - SPAWN_AREA) // max(battle_rooms, 1)
+    for i in range(battle_rooms):
+        x = SPAWN_AREA + i*spacing + max(spacing - ROOM_SIZE[0], 0)//2
+        floor = min([h for h in heights[x:x+ROOM_SIZE[0]] if h is not None] or [height-3])
+        top = floor - ROOM_SIZE[1]
+        exits = [f"e{i}_left", f"e{i}_right"]
+        objects.append({"rect": [x*TILESIZE, top*TILESIZE, ROOM_SIZE[0]*TILESIZE, ROOM_SIZE[1]*TILESIZE], "name": "BattleRoom", "properties": {
+            "exits": ",".join(exits),
+            "enemy_ids": ";".join(f"d{i}_{wave}" for wave in range(waves)),
+            "waves": str(waves),
+        }})
+        objects.append({"rect": [(x-3)*TILESIZE, (floor-3)*TILESIZE, TILESIZE, 3*TILESIZE], "name": exits[0], "properties": {}})
+        objects.append({"rect": [(x+ROOM_SIZE[0]+2)*TILESIZE, (floor-3)*TILESIZE, TILESIZE, 3*TILESIZE], "name": exits[1], "properties": {}})
+
+        for wave in range(waves):
+            for j in range(wave_size):
+                ex = x + rng.randrange(1, ROOM_SIZE[0]-1)
+                ey = top + rng.randrange(1, ROOM_SIZE[1]-4)
+                objects.append({"rect": [ex*TILESIZE, ey*TILESIZE, TILESIZE, TILESIZE], "name": f"d{i}_{wave}", "properties": {"enemy": "drone"}})
+
+    return {
+        "tilesets": ["data/images/tilesets/tileset_green.png", "data/images/tilesets/tileset_cherry.png", "data/images/tilesets/trees.json"],
+        "bounds": {"left": 0, "right": width, "top": 0, "bottom": height},
+        "size": [width, height],
+        "auto_tile_rules": {},
+        "objects": objects,
+        "level": {"background": {}, "decor": {}, "tiles": tiles, "foreground": {}},
+    }
+
+def write_level(data, path):
+    with open(path, "w") as file:
+        json.dump(data, file)
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Generate a level for stress testing")
+    parser.add_argument("path", help="where to write the .lvl file")
+    parser.add_argument("--width", type=int, default=400, help="in tiles")
+    parser.add_argument("--height", type=int, default=60, help="in tiles")
+    parser.add_argument("--density", type=float, default=0.9, help="0 to 1, less means more pits and fewer platforms")
+    parser.add_argument("--enemies", type=int, default=20)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="enemy weights, e.g. drone=3,Roller=1")
+    parser.add_argument("--battle-rooms", type=int, default=1)
+    parser.add_argument("--waves", type=int, default=2)
+    parser.add_argument("--wave-size", type=int, default=4)
+    parser.add_argument("--trees", type=int, default=None, help="defaults to one per 25 columns")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(args)
+    if args.width < MIN_WIDTH:
+        parser.error(f"--width must be at least {MIN_WIDTH} tiles")
+
+    data = generate(args.width, args.height, args.density, args.enemies, args.mix, args.battle_rooms, args.waves, args.wave_size, args.trees, args.seed)
+
+    errors = L.validate_level(L.from_json(data))
+    for error in errors:
+        print(error)
+    if errors:
+        return 1
+
+    write_level(data, args.path)
+    tile_count = len(data["level"]["tiles"])
+    print(f"Wrote {args.path}: {args.width}x{args.height} tiles, {tile_count} placed, {len(data['objects'])} objects")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())